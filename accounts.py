@@ -0,0 +1,163 @@
+import itertools
+import logging
+import threading
+import time
+
+from metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+ACCOUNT_SENDS = Counter('wellfound_account_sends_total', 'Sends per Wellfound account by outcome',
+                        labelnames=('account', 'status'))
+
+
+class UnknownAccountError(KeyError):
+    """Raised when a send names an account that isn't registered in this process"""
+
+
+class Account:
+    """One Wellfound identity: its cookie jar, its driver pool and send counters.
+
+    The pool is created on first use by ``make_pool(account)`` so accounts that
+    never send don't start browsers.
+    """
+
+    def __init__(self, name, session_store, make_pool):
+        self.name = name
+        self.session_store = session_store
+        self._make_pool = make_pool
+        self._pool = None
+        self._lock = threading.Lock()
+        self.assigned = 0
+        self.sent = 0
+        self.failed = 0
+        self.last_error = None
+        self.last_sent_at = None
+        self._sent_times = []
+
+    @property
+    def pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = self._make_pool(self)
+                self._pool.start()
+            return self._pool
+
+    @property
+    def pool_started(self):
+        return self._pool is not None
+
+    def is_healthy(self):
+        """False once the session is known to be logged out or the pool can't start a browser"""
+        if self.session_store.valid is False:
+            return False
+        if self._pool is not None:
+            stats = self._pool.stats()
+            if stats['live'] == 0 and stats['last_error']:
+                return False
+        return True
+
+    def assign(self):
+        with self._lock:
+            self.assigned += 1
+
+    def release(self):
+        """Drop an assignment that didn't end in a send of its own"""
+        with self._lock:
+            self.assigned = max(0, self.assigned - 1)
+
+    def record(self, success, error=None):
+        """Count a finished send and release its assignment"""
+        now = time.time()
+        with self._lock:
+            self.assigned = max(0, self.assigned - 1)
+            if success:
+                self.sent += 1
+                self.last_sent_at = now
+                self._sent_times.append(now)
+            else:
+                self.failed += 1
+                self.last_error = error
+            # Only the last minute matters for throughput
+            cutoff = now - 60
+            while self._sent_times and self._sent_times[0] < cutoff:
+                self._sent_times.pop(0)
+        ACCOUNT_SENDS.inc(account=self.name, status='succeeded' if success else 'failed')
+
+    def stats(self):
+        healthy = self.is_healthy()
+        with self._lock:
+            cutoff = time.time() - 60
+            return {
+                'account': self.name,
+                'healthy': healthy,
+                'assigned': self.assigned,
+                'sent': self.sent,
+                'failed': self.failed,
+                'sent_last_minute': sum(1 for t in self._sent_times if t >= cutoff),
+                'last_sent_at': self.last_sent_at,
+                'last_error': self.last_error,
+                'session': self.session_store.status(),
+                'pool': self._pool.stats() if self._pool is not None else None,
+            }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+
+
+class AccountRegistry:
+    """The Wellfound accounts this process sends from.
+
+    Sends that name a sender go to that account; the rest are spread over the
+    healthy accounts, least-loaded first, rotating between equally loaded ones.
+    """
+
+    def __init__(self, accounts=()):
+        self._lock = threading.Lock()
+        self._accounts = {}
+        self._rotation = itertools.count()
+        for account in accounts:
+            self.add(account)
+
+    def add(self, account):
+        with self._lock:
+            self._accounts[account.name] = account
+
+    def names(self):
+        with self._lock:
+            return list(self._accounts)
+
+    def all(self):
+        with self._lock:
+            return list(self._accounts.values())
+
+    def get(self, name):
+        with self._lock:
+            account = self._accounts.get(name)
+        if account is None:
+            raise UnknownAccountError(name)
+        return account
+
+    def pick(self, name=None):
+        """Return the named account, or the least-loaded healthy one, and assign a send to it"""
+        if name:
+            account = self.get(name)
+        else:
+            accounts = self.all()
+            if not accounts:
+                raise UnknownAccountError('No accounts configured')
+            # With every account unhealthy, still pick one so the send reports the real error
+            candidates = [a for a in accounts if a.is_healthy()] or accounts
+            offset = next(self._rotation)
+            order = {a.name: (i - offset) % len(candidates) for i, a in enumerate(candidates)}
+            account = min(candidates, key=lambda a: (a.assigned, order[a.name]))
+        account.assign()
+        return account
+
+    def stats(self):
+        return [account.stats() for account in self.all()]
+
+    def shutdown(self):
+        for account in self.all():
+            account.shutdown()
@@ -1,108 +1,707 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, send_from_directory
 from flask_cors import CORS
-from wellfound_automation import WellfoundAutomation
+from wellfound_automation import WellfoundAutomation, DEFAULT_COOKIES, SELECTOR_STATS
+from driver_pool import DriverPool, PoolTimeoutError
+from session_store import SessionStore
+from accounts import Account, AccountRegistry, UnknownAccountError
+from thread_cache import ThreadCache
+from diagnostics import DiagnosticsStore
+from supervisor import SUPERVISOR
+from session_health import SessionHealthChecker
+from message_templates import TemplateError, TemplateStore
+from job_queue import IdempotencyConflictError, JobQueue, JobStore, RequeueJob
+from job_events import JobEvents, TERMINAL, format_sse
+from rate_limiter import RateLimiter, parse_priority, recipient_key
+import metrics
+import math
 import os
 from dotenv import load_dotenv
 import logging
 import json
+import atexit
+import queue
+import threading
 
 # Load environment variables
 load_dotenv()
 
-# Configure logging
+# Configure logging, tagging each line with the trace id of the request or job it belongs to
+metrics.install_log_trace_ids()
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    format='%(asctime)s - %(name)s - %(levelname)s - [%(trace_id)s] %(message)s'
 )
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 CORS(app)
 
+@app.before_request
+def assign_trace_id():
+    g.trace_id = request.headers.get('X-Request-ID') or metrics.new_trace_id()
+    metrics.set_trace_id(g.trace_id)
+
+@app.after_request
+def add_trace_header(response):
+    if 'trace_id' in g:
+        response.headers['X-Request-ID'] = g.trace_id
+    return response
+
+# Messages may only target this site (a local mock server when benchmarking)
+BASE_URL = os.getenv('WELLFOUND_BASE_URL', 'https://wellfound.com').rstrip('/')
+
+# Recipient profile -> conversation URL, shared by every account's drivers (keyed per account)
+THREAD_CACHE_TTL = int(os.getenv('THREAD_CACHE_TTL_HOURS', '168')) * 3600
+THREAD_CACHE = ThreadCache(os.getenv('THREAD_CACHE_FILE', 'thread_cache.db'), ttl=THREAD_CACHE_TTL) if THREAD_CACHE_TTL else None
+
+# Failure screenshots and DOM snippets, filed per job id in a size-bounded directory
+DIAGNOSTICS_MAX_MB = int(os.getenv('DIAGNOSTICS_MAX_MB', '50'))
+DIAGNOSTICS = DiagnosticsStore(
+    os.getenv('DIAGNOSTICS_DIR', 'diagnostics'), max_bytes=DIAGNOSTICS_MAX_MB * 1024 * 1024
+) if DIAGNOSTICS_MAX_MB else None
+
+def get_automation(account):
+    automation = WellfoundAutomation(
+        headless=True,
+        tabs=int(os.getenv('DRIVER_TABS', '1')),
+        fast_path=os.getenv('HTTP_FAST_PATH', 'false').lower() == 'true',
+        session_store=account.session_store,
+        account=account.name,
+        thread_cache=THREAD_CACHE,
+        diagnostics=DIAGNOSTICS,
+        lean=os.getenv('LEAN_BROWSER', 'false').lower() == 'true',
+        page_load_strategy=os.getenv('PAGE_LOAD_STRATEGY', 'normal'),
+        input_mode=os.getenv('INPUT_MODE', 'js'),
+        blocked_urls=[u.strip() for u in os.getenv('BLOCKED_URLS').split(',') if u.strip()] if os.getenv('BLOCKED_URLS') else None
+    )
+    
+    try:
+        # Use specific cookies for authentication
+        if automation.setup_with_specific_cookies():
+            logger.info("Successfully authenticated with specific cookies")
+            return automation
+        
+        logger.error("Cookie authentication failed")
+        raise Exception("Failed to authenticate with cookies")
+    except Exception as e:
+        automation.close()
+        raise e
+
+def make_pool(account):
+    """Driver pool for one account; DRIVER_POOL_SIZE applies per account"""
+    return DriverPool(
+        factory=lambda: get_automation(account),
+        size=int(os.getenv('DRIVER_POOL_SIZE', '2')),
+        max_uses=int(os.getenv('DRIVER_MAX_USES', '50')),
+        max_age=int(os.getenv('DRIVER_MAX_AGE_MINUTES', '30')) * 60,
+        checkout_timeout=int(os.getenv('DRIVER_CHECKOUT_TIMEOUT', '90'))
+    )
+
+def load_accounts():
+    """Build the account registry from ACCOUNTS, or a single 'default' account"""
+    verify_ttl = int(os.getenv('SESSION_VERIFY_TTL', '600'))
+    names = [n.strip() for n in os.getenv('ACCOUNTS', '').split(',') if n.strip()]
+    if not names:
+        store = SessionStore(os.getenv('SESSION_COOKIES_FILE', 'browser_cookies.json'), verify_ttl=verify_ttl)
+        return AccountRegistry([Account('default', store, make_pool)])
+    
+    # One cookie file per account so each identity can be refreshed independently
+    accounts_dir = os.getenv('ACCOUNTS_DIR', 'accounts')
+    os.makedirs(accounts_dir, exist_ok=True)
+    return AccountRegistry([
+        Account(name, SessionStore(os.path.join(accounts_dir, f'{name}.json'), verify_ttl=verify_ttl), make_pool)
+        for name in names
+    ])
+
+# Named message templates, compiled once and rendered per recipient
+TEMPLATES = TemplateStore(os.getenv('TEMPLATES_FILE', 'message_templates.json'))
+
+# Kill browsers left behind by earlier runs before starting new ones
+SUPERVISOR.start()
+
+# Wellfound identities this process sends from, each with its own cookie jar and driver pool
+ACCOUNTS = load_accounts()
+atexit.register(ACCOUNTS.shutdown)
+
+def account_credentials(name):
+    """Login for an account from the environment: WELLFOUND_EMAIL/PASSWORD for 'default', suffixed _<NAME> otherwise"""
+    suffix = '' if name == 'default' else f'_{name.upper()}'
+    return os.getenv(f'WELLFOUND_EMAIL{suffix}'), os.getenv(f'WELLFOUND_PASSWORD{suffix}')
+
+def refresh_session(account):
+    """Log an account in again with a throwaway browser; None when it has no credentials"""
+    email, password = account_credentials(account.name)
+    if not email or not password:
+        return None
+    automation = WellfoundAutomation(
+        headless=True,
+        session_store=account.session_store,
+        account=account.name,
+        diagnostics=DIAGNOSTICS
+    )
+    try:
+        # Saving the new cookies bumps the store's generation, so pooled drivers pick them up
+        return automation.login(email, password)
+    finally:
+        automation.close()
+
+# Probe every account's session ahead of sends, logging back in when one has died (off by default)
+SESSION_CHECK_INTERVAL = int(os.getenv('SESSION_CHECK_INTERVAL', '0'))
+SESSION_HEALTH = SessionHealthChecker(
+    ACCOUNTS,
+    BASE_URL,
+    refresh=refresh_session,
+    # Drivers fall back to the built-in cookies for the default account, so the probe does too
+    fallback=lambda account: DEFAULT_COOKIES if account.name == 'default' else None,
+    interval=SESSION_CHECK_INTERVAL,
+    refresh_backoff=int(os.getenv('SESSION_REFRESH_BACKOFF_MINUTES', '30')) * 60,
+    timeout=int(os.getenv('SESSION_PROBE_TIMEOUT', '10'))
+)
+if SESSION_CHECK_INTERVAL:
+    SESSION_HEALTH.start()
+
+def request_account():
+    """The account named by the request, or the first one when only one is configured"""
+    name = request_field('account') or request.args.get('account')
+    if name:
+        return ACCOUNTS.get(name)
+    return ACCOUNTS.all()[0]
+
 @app.route('/set-cookies', methods=['POST'])
 def set_cookies():
     try:
         cookies = request.json.get('cookies')
         if not cookies:
             return jsonify({'error': 'No cookies provided'}), 400
+        if not request.json.get('account') and len(ACCOUNTS.names()) > 1:
+            return jsonify({'error': 'Please specify which account the cookies belong to'}), 400
+        account = request_account()
             
-        # Store cookies in a file for later use
-        with open('browser_cookies.json', 'w') as f:
-            json.dump(cookies, f)
+        # Pooled drivers pick these up on their next checkout
+        account.session_store.set_cookies(cookies)
         
-        return jsonify({'message': 'Cookies saved successfully'}), 200
+        return jsonify({'message': 'Cookies saved successfully', 'account': account.name}), 200
+    except UnknownAccountError as e:
+        return jsonify({'error': f'Unknown account: {e.args[0]}'}), 404
     except Exception as e:
         logger.error(f"Error saving cookies: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
-def get_automation():
-    automation = WellfoundAutomation(headless=True)
+@app.route('/session', methods=['GET'])
+def session_status():
+    try:
+        account = request_account()
+    except UnknownAccountError as e:
+        return jsonify({'error': f'Unknown account: {e.args[0]}'}), 404
+    return jsonify(dict(account.session_store.status(), account=account.name)), 200
+
+@app.route('/accounts', methods=['GET'])
+def account_status():
+    return jsonify([
+        dict(stats, session_check=SESSION_HEALTH.status(stats['account'])) for stats in ACCOUNTS.stats()
+    ]), 200
+
+def run_send_job(job):
+    """Job queue handler: send one message on a pooled browser session of the job's account"""
+    message_url = job['payload']['message_url']
+    message = job['payload']['message']
+    try:
+        account = ACCOUNTS.get(job['payload'].get('account') or 'default')
+    except UnknownAccountError:
+        raise Exception(f"Account {job['payload'].get('account')} is not configured in this process")
+    
+    job_queue = get_job_queue()
+    
+    def on_stage(stage, **data):
+        # Past this point a crash must not lead to a resend
+        if stage == 'submitting':
+            job_queue.store.mark_submitted(job['id'])
+        job_queue.publish(job['id'], stage, **data)
     
     try:
-        # Use specific cookies for authentication
-        if automation.setup_with_specific_cookies():
-            logger.info("Successfully authenticated with specific cookies")
-            return automation
-        
-        logger.error("Cookie authentication failed")
-        raise Exception("Failed to authenticate with cookies")
+        with account.pool.session() as automation:
+            logger.info(f"Job {job['id']} checked out warm browser session for account {account.name}")
+            # Checkout only hands out sessions whose login is verified
+            on_stage('driver_acquired', account=account.name)
+            on_stage('authenticated')
+            automation.on_stage = on_stage
+            automation.diagnostics_key = job['id']
+            try:
+                success = automation.send(message_url, message)
+            finally:
+                automation.on_stage = None
+                automation.diagnostics_key = None
+    except PoolTimeoutError as e:
+        # Every session is busy (e.g. with batches) and nothing was sent yet, so wait in the queue again
+        raise RequeueJob(str(e))
     except Exception as e:
-        automation.close()
-        raise e
+        account.record(False, str(e))
+        raise
+    
+    account.record(success, None if success else 'Failed to send message')
+    if not success:
+        if DIAGNOSTICS:
+            raise Exception(f"Failed to send message. Screenshot and page snapshot: /diagnostics/{job['id']}")
+        raise Exception('Failed to send message')
+    return {'message': 'Message sent successfully!', 'account': account.name,
+            'confirmation': automation.last_confirmation}
+
+# Token buckets shared by queued and batch sends; 0 disables a scope
+LIMITER = RateLimiter(
+    global_per_minute=float(os.getenv('RATE_GLOBAL_PER_MINUTE', '60')),
+    account_per_minute=float(os.getenv('RATE_ACCOUNT_PER_MINUTE', '30')),
+    recipient_per_minute=float(os.getenv('RATE_RECIPIENT_PER_MINUTE', '1')),
+    burst=int(os.getenv('RATE_BURST', '5')),
+    jitter=float(os.getenv('RATE_JITTER_SECONDS', '0.5'))
+)
+
+# Backpressure: beyond this many queued jobs /send answers 429 instead of growing the backlog
+MAX_QUEUED_JOBS = int(os.getenv('MAX_QUEUED_JOBS', '1000'))
+# Each open event stream holds a server thread, so only this many may be open at once
+EVENT_STREAM_SLOTS = threading.BoundedSemaphore(int(os.getenv('MAX_EVENT_STREAMS', '16')))
+# Batch sessions running at once across all /send/batch requests
+BATCH_SESSION_SLOTS = threading.BoundedSemaphore(int(os.getenv('DRIVER_POOL_SIZE', '2')) * len(ACCOUNTS.names()))
+
+def too_busy(message, retry_after):
+    """429 response telling the client when to come back"""
+    response = jsonify({'error': message, 'retry_after': retry_after})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+# Identical recipient + message pairs within this window return the earlier job instead of resending
+DEDUPE_WINDOW = int(os.getenv('DEDUPE_WINDOW_HOURS', '24')) * 3600
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+def get_job_queue():
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue(
+                handler=run_send_job,
+                store=JobStore(os.getenv('JOBS_DB', 'wellfound_jobs.db')),
+                concurrency=int(os.getenv('WORKER_CONCURRENCY', os.getenv('DRIVER_POOL_SIZE', '2'))),
+                limiter=LIMITER,
+                events=JobEvents(),
+                accounts=ACCOUNTS.names()
+            )
+            _job_queue.start()
+            atexit.register(_job_queue.stop)
+        return _job_queue
+
+def job_response(job):
+    return {
+        'job_id': job['id'],
+        'status': job['status'],
+        'result': job['result'],
+        'error': job['error'],
+        'created_at': job['created_at'],
+        'started_at': job['started_at'],
+        'finished_at': job['finished_at'],
+        'submitted_at': job['submitted_at'],
+        'status_url': f"/jobs/{job['id']}",
+        'diagnostics_url': f"/diagnostics/{job['id']}" if DIAGNOSTICS and DIAGNOSTICS.has(job['id']) else None
+    }
+
+def request_field(name):
+    """Read a field from either form data or a JSON body"""
+    if request.form.get(name):
+        return request.form.get(name)
+    data = request.get_json(silent=True) or {}
+    return data.get(name)
 
 @app.route('/send', methods=['POST'])
 def send_message():
     try:
         # Get data from request
-        message_url = request.form.get('message_url') or request.json.get('message_url')
-        message = request.form.get('message') or request.json.get('message')
+        message_url = request_field('message_url')
+        message = request_field('message')
+        template_id = request_field('template_id')
+        webhook_url = request_field('webhook_url')
+        idempotency_key = request.headers.get('Idempotency-Key') or request_field('idempotency_key')
+        try:
+            priority = parse_priority(request_field('priority'))
+        except ValueError:
+            return jsonify({'error': "Priority must be 'high', 'normal', 'low' or an integer"}), 400
         
         logger.info(f"Received request to send message to: {message_url}")
         
+        if template_id and not message:
+            template = TEMPLATES.get(template_id)
+            if not template:
+                return jsonify({'error': f'Unknown template: {template_id}'}), 404
+            variables = request_field('variables')
+            try:
+                if isinstance(variables, str):
+                    # Form posts carry the variables as a JSON string
+                    try:
+                        variables = json.loads(variables)
+                    except ValueError:
+                        raise TemplateError('Variables must be a JSON object')
+                message = template.render(variables)
+            except TemplateError as e:
+                return jsonify({'error': str(e)}), 400
+        
         if not message_url or not message:
             logger.error("Missing required fields")
             return jsonify({'error': 'Please provide both message URL and message'}), 400
             
-        if not message_url.startswith('https://wellfound.com/'):
+        if not message_url.startswith(BASE_URL + '/'):
             logger.error("Invalid Wellfound URL")
             return jsonify({'error': 'Please provide a valid Wellfound URL'}), 400
         
-        automation = None
+        job_queue = get_job_queue()
+        queued = job_queue.store.count('queued')
+        if queued >= MAX_QUEUED_JOBS:
+            retry_after = max(1, math.ceil(job_queue.estimated_wait(queued - MAX_QUEUED_JOBS + 1)))
+            logger.warning(f"Rejecting send: {queued} jobs already queued")
+            return too_busy('Send queue is full, please retry later', retry_after)
+        
+        # Route to the requested sender, or spread over the healthy accounts
         try:
-            automation = get_automation()
-            logger.info("Automation initialized successfully")
-            
-            # Check if it's a company message thread
-            if '/jobs/messages/' in message_url:
-                logger.info("Detected company message thread")
-                success = automation.send_company_message(message_url, message)
-            else:
-                logger.info("Detected regular message")
-                success = automation.send_message(message_url, message)
-            
-            if success:
-                logger.info("Message sent successfully")
-                return jsonify({'message': 'Message sent successfully!'}), 200
-            else:
-                logger.error("Failed to send message")
-                return jsonify({'error': 'Failed to send message. Please check debug_screenshot.png for details.'}), 500
-                
-        except Exception as e:
-            logger.error(f"Error during automation: {str(e)}", exc_info=True)
-            error_msg = str(e)
-            if "Authentication failed" in error_msg:
-                return jsonify({'error': 'Authentication failed. Please check your cookies.'}), 401
-            return jsonify({'error': f'Automation error: {error_msg}'}), 500
-        finally:
-            if automation:
-                try:
-                    automation.close()
-                except Exception as e:
-                    logger.error(f"Error closing automation: {str(e)}")
+            account = ACCOUNTS.pick(request_field('account'))
+        except UnknownAccountError as e:
+            return jsonify({'error': f'Unknown account: {e.args[0]}'}), 400
+        
+        try:
+            job, created = job_queue.submit(
+                {'message_url': message_url, 'message': message, 'account': account.name, 'trace_id': g.trace_id},
+                webhook_url=webhook_url,
+                priority=priority,
+                idempotency_key=idempotency_key,
+                dedupe_window=DEDUPE_WINDOW
+            )
+        except IdempotencyConflictError as e:
+            account.release()
+            return jsonify({'error': str(e)}), 422
+        
+        if not created:
+            # A retry or repeat of an earlier send: answer from the outbox without touching a browser
+            account.release()
+            logger.info(f"Request duplicates job {job['id']} ({job['status']})")
+            return jsonify(dict(job_response(job), duplicate=True)), 200
+        
+        logger.info(f"Queued job {job['id']}")
+        return jsonify(job_response(job)), 202
                     
     except Exception as e:
         logger.error(f"Unexpected error: {str(e)}", exc_info=True)
         return jsonify({'error': 'An unexpected error occurred'}), 500
 
+class SessionLostError(Exception):
+    """Raised inside a pooled session block to retire a driver that died mid-batch"""
+
+# Fresh sessions a batch worker tries in a row without getting a single result before it gives up
+BATCH_SESSION_RETRIES = 3
+
+class BatchWorkers:
+    """Workers still draining one batch, so the last to leave can fail what nobody will send"""
+    
+    def __init__(self, count):
+        self.count = count
+        self._lock = threading.Lock()
+    
+    def leave(self):
+        """Drop one worker; True if it was the last"""
+        with self._lock:
+            self.count -= 1
+            return self.count == 0
+
+def run_batch_worker(account, pending, results, workers, trace_id):
+    """Drain (index, url, message) items from ``pending`` onto ``account``'s pooled sessions.
+
+    One session is kept for as many items as possible; if it dies mid-batch it
+    is retired and a fresh one picks up the remaining items. A worker that
+    can't get a session leaves the items to its siblings; the last worker out
+    fails whatever is still pending.
+    """
+    metrics.set_trace_id(trace_id)
+    error = 'No browser session was available for this item'
+    try:
+        error = drain_batch(account, pending, results) or error
+    finally:
+        account.release()
+        BATCH_SESSION_SLOTS.release()
+        if workers.leave():
+            while True:
+                try:
+                    index, message_url, _ = pending.get_nowait()
+                except queue.Empty:
+                    break
+                results.put({'index': index, 'message_url': message_url, 'success': False,
+                             'error': error, 'elapsed_ms': 0, 'account': account.name})
+
+def drain_batch(account, pending, results):
+    """Send pending items on one session after another; returns why it stopped early, if it did"""
+    failures = 0
+    while not pending.empty():
+        taken = []
+        reported = set()
+        checked_out = False
+        
+        def next_items():
+            while True:
+                try:
+                    index, message_url, message = pending.get_nowait()
+                except queue.Empty:
+                    return
+                # Never sleep here: with several tabs that would stall every open one
+                if LIMITER.try_acquire(account.name, recipient_key(message_url)) > 0:
+                    pending.put((index, message_url, message))
+                    yield None
+                    continue
+                account.assign()
+                taken.append((index, message_url))
+                yield message_url, message
+        
+        try:
+            with account.pool.session() as automation:
+                checked_out = True
+                automation.diagnostics_key = f'batch-{metrics.get_trace_id()}'
+                for result in automation.send_many(next_items()):
+                    reported.add(result['index'])
+                    result['index'] = taken[result['index']][0]
+                    result['account'] = account.name
+                    account.record(result['success'], result['error'])
+                    results.put(result)
+                    if not result['success'] and not automation.is_alive():
+                        raise SessionLostError('Browser session died during batch')
+        except Exception as e:
+            if not checked_out:
+                # Leave the pending items to workers that do have a session
+                logger.error(f"Batch worker could not get a session: {str(e)}")
+                return str(e)
+            # The session is retired on the way out of the block; retry on a fresh one
+            logger.warning(f"Batch session failed, retrying on a fresh one: {str(e)}")
+            failures = 0 if reported else failures + 1
+            if failures >= BATCH_SESSION_RETRIES:
+                logger.error(f"Batch worker giving up after {failures} failed sessions")
+                return str(e)
+        finally:
+            # Items already handed to the browser may have been sent, so fail them rather than retry
+            for position, (index, message_url) in enumerate(taken):
+                if position in reported:
+                    continue
+                error = 'Browser session was lost before the send finished'
+                account.record(False, error)
+                results.put({'index': index, 'message_url': message_url, 'success': False,
+                             'error': error, 'elapsed_ms': 0, 'account': account.name})
+    return None
+
+@app.route('/send/batch', methods=['POST'])
+def send_batch():
+    data = request.get_json(silent=True) or {}
+    items = data.get('items')
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'Please provide a non-empty list of items'}), 400
+    
+    template = None
+    if data.get('template_id'):
+        template = TEMPLATES.get(data['template_id'])
+        if not template:
+            return jsonify({'error': f"Unknown template: {data['template_id']}"}), 404
+    
+    errors = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or not item.get('message_url') or not (template or item.get('message')):
+            errors.append({'index': index, 'error': 'Please provide both message URL and message'})
+        elif not item['message_url'].startswith(BASE_URL + '/'):
+            errors.append({'index': index, 'error': 'Please provide a valid Wellfound URL'})
+    if errors:
+        return jsonify({'error': 'Invalid batch items', 'items': errors}), 400
+    
+    # Render every message up front so a bad variable set fails the batch before any browser work
+    if template:
+        messages, render_errors = template.render_many([item.get('variables') for item in items])
+        if render_errors:
+            return jsonify({'error': 'Template could not be rendered for some items',
+                            'items': [{'index': index, 'error': error} for index, error in render_errors]}), 400
+    else:
+        messages = [item['message'] for item in items]
+    
+    pending = queue.Queue()
+    for index, item in enumerate(items):
+        pending.put((index, item['message_url'], messages[index]))
+    
+    # A named account sends the whole batch; otherwise sessions are spread over healthy accounts
+    try:
+        if data.get('account'):
+            ACCOUNTS.get(data['account'])
+    except UnknownAccountError as e:
+        return jsonify({'error': f'Unknown account: {e.args[0]}'}), 400
+    
+    pool_size = int(os.getenv('DRIVER_POOL_SIZE', '2'))
+    accounts = 1 if data.get('account') else len(ACCOUNTS.names())
+    wanted = max(1, min(int(data.get('sessions') or 1), pool_size * accounts, len(items)))
+    # Take as many batch session slots as are free, up to the number wanted
+    sessions = 0
+    while sessions < wanted and BATCH_SESSION_SLOTS.acquire(blocking=False):
+        sessions += 1
+    if not sessions:
+        return too_busy('All browser sessions are busy with other batches, please retry later',
+                        max(1, math.ceil(get_job_queue().avg_job_seconds)))
+    
+    results = queue.Queue()
+    workers = BatchWorkers(sessions)
+    for _ in range(sessions):
+        # Each worker holds its account's assignment until it finishes, so the next pick spreads out
+        account = ACCOUNTS.pick(data.get('account'))
+        threading.Thread(target=run_batch_worker, args=(account, pending, results, workers, g.trace_id), daemon=True).start()
+    logger.info(f"Sending batch of {len(items)} messages on {sessions} sessions")
+    
+    def stream():
+        # One JSON object per line, in completion order
+        for _ in range(len(items)):
+            yield json.dumps(results.get()) + '\n'
+    
+    return Response(stream(), mimetype='application/x-ndjson')
+
+def pool_total(field):
+    """Sum a pool stat over every account whose pool has started"""
+    pools = [account.pool.stats() for account in ACCOUNTS.all() if account.pool_started]
+    return sum(stats[field] for stats in pools) if pools else None
+
+metrics.Gauge(
+    'wellfound_pool_idle_sessions', 'Warm browser sessions waiting in the pools',
+    lambda: pool_total('idle')
+)
+metrics.Gauge(
+    'wellfound_pool_live_sessions', 'Browser sessions alive in the pools',
+    lambda: pool_total('live')
+)
+metrics.Gauge(
+    'wellfound_accounts_healthy', 'Accounts currently eligible for spread sends',
+    lambda: sum(1 for account in ACCOUNTS.all() if account.is_healthy())
+)
+metrics.Gauge(
+    'wellfound_jobs_queued', 'Send jobs waiting for a worker',
+    lambda: _job_queue.store.count('queued') if _job_queue else None
+)
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/templates', methods=['GET'])
+def list_templates():
+    return jsonify(TEMPLATES.all()), 200
+
+@app.route('/templates/<name>', methods=['GET'])
+def get_template(name):
+    template = TEMPLATES.get(name)
+    if not template:
+        return jsonify({'error': 'Template not found'}), 404
+    return jsonify(template.to_dict()), 200
+
+@app.route('/templates/<name>', methods=['PUT'])
+def put_template(name):
+    data = request.get_json(silent=True) or {}
+    try:
+        template = TEMPLATES.put(name, data.get('body'))
+    except TemplateError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(template.to_dict()), 200
+
+@app.route('/templates/<name>', methods=['DELETE'])
+def delete_template(name):
+    if not TEMPLATES.delete(name):
+        return jsonify({'error': 'Template not found'}), 404
+    return jsonify({'message': 'Template deleted'}), 200
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = get_job_queue().get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job_response(job)), 200
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """Server-Sent Events stream of a job's stages, ending with its final status"""
+    job_queue = get_job_queue()
+    job = job_queue.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    if not EVENT_STREAM_SLOTS.acquire(blocking=False):
+        # Clients can fall back to polling /jobs/<id>
+        return too_busy('Too many open event streams, poll the job status instead', 5)
+    
+    def stream():
+        try:
+            # Jobs that finished before this process started have no history in memory
+            if job['status'] in TERMINAL and not job_queue.events.history(job_id):
+                yield format_sse({'stage': job['status'], 'job_id': job_id, 'at': job['finished_at'] or job['updated_at'],
+                                  'result': job['result'], 'error': job['error']})
+                return
+            for event in job_queue.events.subscribe(job_id):
+                yield format_sse(event)
+        finally:
+            EVENT_STREAM_SLOTS.release()
+    
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/diagnostics/<key>', methods=['GET'])
+def diagnostics_index(key):
+    """Failure artifacts for a job id (or batch-<trace id>, session-<account>)"""
+    if not DIAGNOSTICS:
+        return jsonify({'error': 'Diagnostics are disabled'}), 404
+    artifacts = DIAGNOSTICS.list(key)
+    if not artifacts:
+        return jsonify({'error': 'No diagnostics for this id'}), 404
+    for artifact in artifacts:
+        for field in ('screenshot', 'dom'):
+            if field in artifact:
+                artifact[field] = f"/diagnostics/{key}/{artifact[field]}"
+    return jsonify(artifacts), 200
+
+@app.route('/diagnostics/<key>/<filename>', methods=['GET'])
+def diagnostics_file(key, filename):
+    if not DIAGNOSTICS:
+        return jsonify({'error': 'Diagnostics are disabled'}), 404
+    # Served as plain text so captured markup never renders in the viewer's browser
+    mimetype = 'image/jpeg' if filename.endswith('.jpg') else 'text/plain'
+    return send_from_directory(DIAGNOSTICS.directory(key), filename, mimetype=mimetype)
+
+@app.route('/drivers', methods=['GET'])
+def driver_status():
+    """Per-driver process count, RSS and age as last measured by the supervisor"""
+    return jsonify(SUPERVISOR.stats()), 200
+
+@app.route('/selectors/stats', methods=['GET'])
+def selector_stats():
+    return jsonify(SELECTOR_STATS.snapshot()), 200
+
+atexit.register(SELECTOR_STATS.flush)
+
+def serve():
+    """Run the app on waitress, or Flask's reloading dev server when FLASK_DEBUG is set.
+
+    Waitress accepts connections on an async I/O loop and runs request
+    handlers on a fixed set of threads. Handlers only queue work or read
+    status, so a few threads absorb many clients; browser work stays on the
+    bounded job workers and batch sessions.
+    """
+    host = os.getenv('HOST', '127.0.0.1')
+    port = int(os.getenv('PORT', '5000'))
+    if os.getenv('FLASK_DEBUG', 'false').lower() == 'true':
+        app.run(debug=True, host=host, port=port)
+        return
+    
+    from waitress import serve as waitress_serve
+    threads = int(os.getenv('SERVER_THREADS', '32'))
+    logger.info(f"Serving on http://{host}:{port} with {threads} threads")
+    waitress_serve(
+        app,
+        host=host,
+        port=port,
+        threads=threads,
+        connection_limit=int(os.getenv('SERVER_CONNECTION_LIMIT', '1000')),
+        channel_timeout=int(os.getenv('SERVER_CHANNEL_TIMEOUT', '120')),
+        ident='wellfound-messenger'
+    )
+
 if __name__ == '__main__':
-    app.run(debug=True, port=5000)
+    serve()
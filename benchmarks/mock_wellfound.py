@@ -0,0 +1,235 @@
+"""Local mock of the Wellfound pages WellfoundAutomation touches.
+
+Serves the home page, /login, /inbox, profile pages (/u/<name>), company
+message threads (/jobs/messages/<id>) and a /graphql endpoint for the HTTP
+fast path. Pages render client-side after a configurable delay and expose one
+of several DOM variants so every selector fallback can be exercised.
+
+Run standalone with ``python benchmarks/mock_wellfound.py --port 8765`` and
+point the app at it with ``WELLFOUND_BASE_URL=http://127.0.0.1:8765``.
+"""
+import argparse
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Markup per DOM variant: primary uses data-test hooks, fallback only classes,
+# text only visible text/placeholders (matched by the XPath selectors)
+VARIANTS = {
+    'primary': {
+        'message_button': '<button data-test="message-button">Message</button>',
+        'composer': '<div data-test="messaging-composer"><textarea placeholder="Write a message"></textarea></div>',
+        'send_button': '<button data-test="send-message-button">Send</button>',
+        'company_composer': '<div data-test="messaging-composer"><textarea placeholder="Type a message"></textarea></div>',
+        'company_send_button': '<button data-test="send-message">Send</button>',
+    },
+    'fallback': {
+        'message_button': '<button class="message-button">Message</button>',
+        'composer': '<textarea class="message-input"></textarea>',
+        'send_button': '<button class="send-button">Send</button>',
+        'company_composer': '<textarea class="message-input"></textarea>',
+        'company_send_button': '<button class="send-button">Send</button>',
+    },
+    'text': {
+        'message_button': '<button>Message</button>',
+        'composer': '<textarea placeholder="Write a message here"></textarea>',
+        'send_button': '<button>Send</button>',
+        'company_composer': '<textarea placeholder="Type your reply"></textarea>',
+        'company_send_button': '<button>Send</button>',
+    },
+}
+
+PAGE_TEMPLATE = """<!doctype html>
+<html>
+<head><title>Mock Wellfound</title></head>
+<body>
+<div id="app"></div>
+<script>
+var config = %(config)s;
+function render(html) { document.getElementById('app').innerHTML = html; }
+function wireSend(thread) {
+    var app = document.getElementById('app');
+    var textarea = app.querySelector('textarea');
+    var buttons = app.querySelectorAll('button');
+    var send = buttons[buttons.length - 1];
+    function submit() {
+        var body = textarea.value;
+        if (!body) return;
+        fetch('/api/messages', {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({thread: thread, body: body})
+        }).then(function() {
+            var bubble = document.createElement('div');
+            bubble.setAttribute('data-test', 'message-bubble');
+            bubble.textContent = body;
+            document.querySelector('[data-test="message-thread"]').appendChild(bubble);
+            textarea.value = '';
+        });
+    }
+    send.addEventListener('click', submit);
+    textarea.addEventListener('keydown', function(e) {
+        if (e.key === 'Enter' && !e.shiftKey) { e.preventDefault(); submit(); }
+    });
+}
+setTimeout(function() {
+    var v = config.variant;
+    if (config.page === 'inbox' || config.page === 'home') {
+        render('<div data-test="user-menu">Me</div><h1>' + config.page + '</h1>');
+    } else if (config.page === 'login') {
+        render('<form><input name="email"><input name="password" type="password"><button type="submit">Log in</button></form>');
+    } else if (config.page === 'profile') {
+        render('<h1>' + config.name + '</h1>' + v.message_button);
+        document.querySelector('#app button').addEventListener('click', function() {
+            // Like the real site, opening the composer routes to the conversation
+            history.pushState({}, '', '/jobs/messages/' + config.name);
+            setTimeout(function() {
+                var panel = document.createElement('div');
+                panel.innerHTML = '<div data-test="message-thread"></div>' + v.composer + v.send_button;
+                document.getElementById('app').appendChild(panel);
+                wireSend(config.name);
+            }, config.delay);
+        });
+    } else if (config.page === 'thread') {
+        render('<div data-test="message-thread"></div>' + v.company_composer + v.company_send_button);
+        wireSend(config.name);
+    }
+}, config.delay);
+</script>
+</body>
+</html>
+"""
+
+
+class MockWellfound:
+    """Threaded HTTP server serving the mock site; ``start()`` returns its base URL"""
+
+    def __init__(self, host='127.0.0.1', port=0, delay_ms=200, send_delay_ms=100,
+                 variant='primary', reject_graphql=False):
+        self.host = host
+        self.port = port
+        self.delay_ms = delay_ms
+        self.send_delay_ms = send_delay_ms
+        self.variant = variant
+        self.reject_graphql = reject_graphql
+        self.messages = []
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f'http://{self.host}:{self._server.server_address[1]}'
+
+    def record(self, source, thread, body):
+        with self._lock:
+            self.messages.append({'source': source, 'thread': thread, 'body': body, 'at': time.time()})
+
+    def stats(self):
+        with self._lock:
+            return {
+                'messages': len(self.messages),
+                'graphql': sum(1 for m in self.messages if m['source'] == 'graphql'),
+            }
+
+    def start(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, body, content_type='text/html'):
+                data = body.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _page(self, page, name=''):
+                config = {
+                    'page': page,
+                    'name': name,
+                    'delay': mock.delay_ms,
+                    'variant': VARIANTS[mock.variant],
+                }
+                self._send(200, PAGE_TEMPLATE % {'config': json.dumps(config)})
+
+            def _json_body(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                try:
+                    return json.loads(self.rfile.read(length) or b'{}')
+                except ValueError:
+                    return {}
+
+            def do_GET(self):
+                path = self.path.split('?', 1)[0]
+                if path == '/__stats':
+                    self._send(200, json.dumps(mock.stats()), 'application/json')
+                elif path in ('', '/'):
+                    self._page('home')
+                elif path == '/inbox':
+                    self._page('inbox')
+                elif path == '/login':
+                    self._page('login')
+                elif path.startswith('/u/'):
+                    self._page('profile', path[3:])
+                elif path.startswith('/jobs/messages/'):
+                    self._page('thread', path[len('/jobs/messages/'):])
+                else:
+                    self._send(404, 'Not found', 'text/plain')
+
+            def do_POST(self):
+                path = self.path.split('?', 1)[0]
+                body = self._json_body()
+                time.sleep(mock.send_delay_ms / 1000)
+                if path == '/api/messages':
+                    mock.record('browser', body.get('thread'), body.get('body'))
+                    self._send(200, json.dumps({'ok': True}), 'application/json')
+                elif path == '/graphql':
+                    if mock.reject_graphql:
+                        self._send(403, json.dumps({'errors': [{'message': 'Forbidden'}]}), 'application/json')
+                        return
+                    variables = body.get('variables') or {}
+                    mock.record('graphql', variables.get('threadId'), variables.get('body'))
+                    response = {'data': {'sendMessage': {'message': {'id': uuid.uuid4().hex}}}}
+                    self._send(200, json.dumps(response), 'application/json')
+                else:
+                    self._send(404, json.dumps({'error': 'Not found'}), 'application/json')
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve a local mock of Wellfound')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--delay-ms', type=int, default=200, help='client-side render delay')
+    parser.add_argument('--send-delay-ms', type=int, default=100, help='server latency for send requests')
+    parser.add_argument('--variant', choices=sorted(VARIANTS), default='primary')
+    parser.add_argument('--reject-graphql', action='store_true', help='reject fast-path sends to test fallback')
+    args = parser.parse_args()
+
+    mock = MockWellfound(port=args.port, delay_ms=args.delay_ms, send_delay_ms=args.send_delay_ms,
+                         variant=args.variant, reject_graphql=args.reject_graphql)
+    print(f"Mock Wellfound serving at {mock.start()}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        mock.stop()
+
+
+if __name__ == '__main__':
+    main()
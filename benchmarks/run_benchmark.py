@@ -0,0 +1,273 @@
+"""Offline throughput benchmark against the local mock Wellfound site.
+
+Drives either WellfoundAutomation directly or the /send endpoint (queue,
+workers and driver pool included) at several concurrency levels, and reports
+p50/p95 send latency, messages per minute and peak RSS of the process tree
+(Python plus its Chrome/chromedriver children).
+
+    python benchmarks/run_benchmark.py --mode automation --concurrency 1 2 4 --messages 40
+    python benchmarks/run_benchmark.py --mode endpoint --concurrency 1 4 --variant fallback
+
+Each concurrency level runs in a fresh subprocess so memory and pool state
+don't leak between levels. Requires Chrome, like the app itself.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_wellfound import MockWellfound, VARIANTS  # noqa: E402
+
+
+def process_tree_rss(pid):
+    """Resident memory in bytes of ``pid`` and all its descendants (Linux /proc)"""
+    try:
+        import psutil
+        root = psutil.Process(pid)
+        total = 0
+        for proc in [root] + root.children(recursive=True):
+            try:
+                total += proc.memory_info().rss
+            except psutil.Error:
+                pass
+        return total
+    except ImportError:
+        pass
+
+    children = {}
+    rss = {}
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            children.setdefault(int(fields[1]), []).append(int(entry))
+            rss[int(entry)] = int(fields[21]) * page_size
+        except (OSError, IndexError, ValueError):
+            continue
+    total, stack = 0, [pid]
+    while stack:
+        current = stack.pop()
+        total += rss.get(current, 0)
+        stack.extend(children.get(current, []))
+    return total
+
+
+class RssSampler:
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, process_tree_rss(os.getpid()))
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def build_items(base_url, count):
+    """Alternate between profile sends and company thread sends"""
+    items = []
+    for i in range(count):
+        if i % 2:
+            items.append((f'{base_url}/jobs/messages/{i}', f'Benchmark thread message {i}'))
+        else:
+            items.append((f'{base_url}/u/candidate-{i}', f'Benchmark profile message {i}'))
+    return items
+
+
+def summarize(latencies, ok, total, elapsed, peak_rss):
+    latencies = sorted(latencies)
+    p95_index = max(0, int(round(len(latencies) * 0.95)) - 1)
+    return {
+        'messages': total,
+        'succeeded': ok,
+        'p50_ms': round(statistics.median(latencies)) if latencies else None,
+        'p95_ms': round(latencies[p95_index]) if latencies else None,
+        'messages_per_minute': round(ok / elapsed * 60, 1) if elapsed else None,
+        'elapsed_s': round(elapsed, 2),
+        'peak_rss_mb': round(peak_rss / 1024 / 1024, 1),
+    }
+
+
+def run_automation_level(mock, concurrency, messages, args):
+    from session_store import SessionStore
+    from wellfound_automation import WellfoundAutomation
+
+    items = build_items(mock.base_url, messages)
+    chunks = [items[i::concurrency] for i in range(concurrency)]
+    latencies, outcomes = [], []
+    lock = threading.Lock()
+
+    def worker(chunk):
+        automation = WellfoundAutomation(
+            headless=True, base_url=mock.base_url, session_store=SessionStore(None),
+            lean=args.lean, page_load_strategy=args.page_load_strategy, input_mode=args.input_mode
+        )
+        try:
+            automation.setup_with_specific_cookies()
+            for url, message in chunk:
+                started = time.monotonic()
+                success = automation.send(url, message)
+                with lock:
+                    latencies.append((time.monotonic() - started) * 1000)
+                    outcomes.append(success)
+        finally:
+            automation.close()
+
+    with RssSampler() as sampler:
+        started = time.monotonic()
+        threads = [threading.Thread(target=worker, args=(chunk,)) for chunk in chunks if chunk]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+    return summarize(latencies, sum(outcomes), messages, elapsed, sampler.peak)
+
+
+def run_endpoint_level(mock, concurrency, messages, args):
+    tmp = tempfile.mkdtemp(prefix='wf-bench-')
+    os.environ.update({
+        'WELLFOUND_BASE_URL': mock.base_url,
+        'DRIVER_POOL_SIZE': str(concurrency),
+        'WORKER_CONCURRENCY': str(concurrency),
+        'JOBS_DB': os.path.join(tmp, 'jobs.db'),
+        'SESSION_COOKIES_FILE': os.path.join(tmp, 'cookies.json'),
+        'SELECTOR_STATS_FILE': os.path.join(tmp, 'selector_stats.json'),
+        'LEAN_BROWSER': 'true' if args.lean else 'false',
+        'PAGE_LOAD_STRATEGY': args.page_load_strategy,
+        'INPUT_MODE': args.input_mode,
+        # A background re-login mid-run would skew the memory figures
+        'SESSION_CHECK_INTERVAL': '0',
+        # Measure send throughput, not the rate limiter's pacing
+        'RATE_GLOBAL_PER_MINUTE': '0',
+        'RATE_ACCOUNT_PER_MINUTE': '0',
+        'RATE_RECIPIENT_PER_MINUTE': '0',
+        'RATE_JITTER_SECONDS': '0',
+    })
+    from werkzeug.serving import make_server
+    import app as app_module
+
+    server = make_server('127.0.0.1', 0, app_module.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api = f'http://127.0.0.1:{server.server_port}'
+
+    # Warm the pool first so the run measures steady-state sends, not cold starts
+    pool = app_module.ACCOUNTS.get('default').pool
+    while pool.stats()['idle'] < concurrency:
+        if pool.stats()['last_error']:
+            raise RuntimeError(pool.stats()['last_error'])
+        time.sleep(0.2)
+
+    def post(url, message):
+        request = urllib.request.Request(
+            f'{api}/send', data=json.dumps({'message_url': url, 'message': message}).encode('utf-8'),
+            headers={'Content-Type': 'application/json'}, method='POST'
+        )
+        with urllib.request.urlopen(request) as response:
+            return json.loads(response.read())['job_id']
+
+    def wait(job_id):
+        while True:
+            with urllib.request.urlopen(f'{api}/jobs/{job_id}') as response:
+                job = json.loads(response.read())
+            if job['status'] not in ('queued', 'running'):
+                return job
+            time.sleep(0.05)
+
+    items = build_items(mock.base_url, messages)
+    with RssSampler() as sampler:
+        started = time.monotonic()
+        job_ids = [post(url, message) for url, message in items]
+        jobs = [wait(job_id) for job_id in job_ids]
+        elapsed = time.monotonic() - started
+    server.shutdown()
+
+    latencies = [(job['finished_at'] - job['created_at']) * 1000 for job in jobs if job['finished_at']]
+    ok = sum(1 for job in jobs if job['status'] == 'succeeded')
+    return summarize(latencies, ok, messages, elapsed, sampler.peak)
+
+
+def run_level(args):
+    mock = MockWellfound(delay_ms=args.delay_ms, send_delay_ms=args.send_delay_ms, variant=args.variant)
+    mock.start()
+    try:
+        runner = run_endpoint_level if args.mode == 'endpoint' else run_automation_level
+        result = runner(mock, args.run_level, args.messages, args)
+        result['delivered_to_mock'] = mock.stats()['messages']
+    finally:
+        mock.stop()
+    result.update({'mode': args.mode, 'concurrency': args.run_level, 'variant': args.variant})
+    print(json.dumps(result))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark sends against a local mock Wellfound site')
+    parser.add_argument('--mode', choices=['automation', 'endpoint'], default='automation')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--messages', type=int, default=20, help='messages per concurrency level')
+    parser.add_argument('--variant', choices=sorted(VARIANTS), default='primary')
+    parser.add_argument('--delay-ms', type=int, default=200)
+    parser.add_argument('--send-delay-ms', type=int, default=100)
+    parser.add_argument('--lean', action='store_true')
+    parser.add_argument('--page-load-strategy', default='normal')
+    parser.add_argument('--input-mode', default='js')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--run-level', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_level:
+        run_level(args)
+        return
+
+    results = []
+    for level in args.concurrency:
+        command = [
+            sys.executable, os.path.abspath(__file__), '--run-level', str(level),
+            '--mode', args.mode, '--messages', str(args.messages), '--variant', args.variant,
+            '--delay-ms', str(args.delay_ms), '--send-delay-ms', str(args.send_delay_ms),
+            '--page-load-strategy', args.page_load_strategy, '--input-mode', args.input_mode,
+        ] + (['--lean'] if args.lean else [])
+        output = subprocess.run(command, capture_output=True, text=True)
+        lines = [line for line in output.stdout.splitlines() if line.startswith('{')]
+        if output.returncode != 0 or not lines:
+            print(f"Level {level} failed:\n{output.stderr[-2000:]}", file=sys.stderr)
+            continue
+        results.append(json.loads(lines[-1]))
+
+    header = f"{'mode':<11}{'conc':>5}{'ok/total':>10}{'p50 ms':>9}{'p95 ms':>9}{'msg/min':>9}{'peak RSS MB':>13}"
+    print(header)
+    print('-' * len(header))
+    for r in results:
+        print(f"{r['mode']:<11}{r['concurrency']:>5}{str(r['succeeded']) + '/' + str(r['messages']):>10}"
+              f"{r['p50_ms'] or '-':>9}{r['p95_ms'] or '-':>9}{r['messages_per_minute'] or '-':>9}{r['peak_rss_mb']:>13}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+
+import chromedriver_autoinstaller
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.getenv('WELLFOUND_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'wellfound-messenger'))
+
+_driver_lock = threading.Lock()
+_driver_path = None
+
+# Profile entries that identify a session or lock the profile; never copied into the template
+PROFILE_EXCLUDES = [
+    'Singleton*', 'lockfile', 'Cookies', 'Cookies-journal', 'Login Data*', 'Sessions',
+    'Current Session', 'Current Tabs', 'Last Session', 'Last Tabs',
+    'Local Storage', 'Session Storage', 'IndexedDB', 'Web Data*', 'History*',
+]
+
+
+def resolve_chromedriver():
+    """Return a chromedriver path, resolved once per process and cached on disk per Chrome major version"""
+    global _driver_path
+    with _driver_lock:
+        if _driver_path and os.path.exists(_driver_path):
+            return _driver_path
+
+        cache_file = os.path.join(CACHE_DIR, 'chromedriver.json')
+        version = None
+        try:
+            version = (chromedriver_autoinstaller.get_chrome_version() or '').split('.')[0] or None
+        except Exception as e:
+            logger.warning(f"Could not detect Chrome version: {str(e)}")
+
+        cache = {}
+        if os.path.exists(cache_file):
+            try:
+                with open(cache_file, 'r') as f:
+                    cache = json.load(f)
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable chromedriver cache: {str(e)}")
+
+        path = cache.get(version) if version else None
+        if path and os.path.exists(path):
+            logger.info(f"Using cached chromedriver for Chrome {version}")
+        else:
+            path = chromedriver_autoinstaller.install()
+            if version and path:
+                cache[version] = path
+                try:
+                    os.makedirs(CACHE_DIR, exist_ok=True)
+                    with open(cache_file, 'w') as f:
+                        json.dump(cache, f)
+                except Exception as e:
+                    logger.warning(f"Could not write chromedriver cache: {str(e)}")
+
+        _driver_path = path
+        return path
+
+
+class ProfileTemplate:
+    """Reusable Chrome user-data-dir so new drivers skip first-run initialisation.
+
+    Each driver gets a private copy of the template. The first driver to
+    close cleanly while no template exists saves its profile (minus cookies,
+    storage and lock files) as the template for later cold starts.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def checkout(self):
+        """Create a private profile dir, seeded from the template when one exists"""
+        profile_dir = tempfile.mkdtemp(prefix='wellfound-profile-')
+        if os.path.isdir(self.path):
+            try:
+                shutil.copytree(self.path, profile_dir, dirs_exist_ok=True)
+            except Exception as e:
+                logger.warning(f"Could not copy profile template: {str(e)}")
+        return profile_dir
+
+    def release(self, profile_dir):
+        """Save ``profile_dir`` as the template if there is none yet, then delete it"""
+        try:
+            with self._lock:
+                if not os.path.isdir(self.path):
+                    staging = self.path + '.tmp'
+                    shutil.rmtree(staging, ignore_errors=True)
+                    shutil.copytree(profile_dir, staging, ignore=shutil.ignore_patterns(*PROFILE_EXCLUDES))
+                    os.replace(staging, self.path)
+                    logger.info(f"Saved Chrome profile template to {self.path}")
+        except Exception as e:
+            logger.warning(f"Could not save profile template: {str(e)}")
+        finally:
+            shutil.rmtree(profile_dir, ignore_errors=True)
+
+
+PROFILE_TEMPLATE = ProfileTemplate(os.getenv('CHROME_PROFILE_TEMPLATE', os.path.join(CACHE_DIR, 'profile-template')))
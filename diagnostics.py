@@ -0,0 +1,155 @@
+import base64
+import json
+import logging
+import os
+import queue
+import re
+import shutil
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+ARTIFACTS_DROPPED = Counter('wellfound_diagnostics_dropped_total', 'Failure artifacts dropped because the writer fell behind')
+
+# Page state captured next to each screenshot; the DOM is truncated so artifacts stay small
+DOM_SNAPSHOT_SCRIPT = """
+var html = document.documentElement ? document.documentElement.outerHTML : '';
+return {
+    url: location.href,
+    title: document.title,
+    ready_state: document.readyState,
+    width: window.innerWidth,
+    height: window.innerHeight,
+    html: html.length > arguments[0] ? html.slice(0, arguments[0]) + '\\n<!-- truncated -->' : html
+};
+"""
+
+_SAFE_KEY = re.compile(r'[^A-Za-z0-9_.-]')
+
+
+def safe_key(key):
+    return _SAFE_KEY.sub('_', str(key))[:100] or '_'
+
+
+class DiagnosticsStore:
+    """Size-bounded ring buffer of failure artifacts on disk, grouped by job id.
+
+    ``save`` only enqueues; a writer thread decodes and writes the files and
+    evicts the oldest groups once the total exceeds ``max_bytes``. When the
+    writer falls behind, new artifacts are dropped rather than blocking a send.
+    """
+
+    def __init__(self, root='diagnostics', max_bytes=50 * 1024 * 1024, max_per_key=10, backlog=50):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_per_key = max_per_key
+        self._queue = queue.Queue(maxsize=backlog)
+        self._lock = threading.Lock()
+        self._sizes = OrderedDict()
+        self._seq = 0
+        os.makedirs(root, exist_ok=True)
+        self._load()
+        threading.Thread(target=self._write_loop, name='diagnostics-writer', daemon=True).start()
+
+    def _load(self):
+        groups = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if os.path.isdir(path):
+                size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+                groups.append((os.path.getmtime(path), name, size))
+        for _, name, size in sorted(groups):
+            self._sizes[name] = size
+
+    @property
+    def total_bytes(self):
+        with self._lock:
+            return sum(self._sizes.values())
+
+    def save(self, key, reason, screenshot_b64, snapshot):
+        """Queue one artifact (base64 JPEG plus DOM snapshot) for ``key``"""
+        try:
+            self._queue.put_nowait((safe_key(key), reason, screenshot_b64, snapshot, time.time()))
+        except queue.Full:
+            ARTIFACTS_DROPPED.inc()
+            logger.warning(f"Dropping diagnostics for {key}: writer is behind")
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            try:
+                self._write(*item)
+            except Exception as e:
+                logger.error(f"Could not write diagnostics: {str(e)}")
+
+    def _write(self, key, reason, screenshot_b64, snapshot, captured_at):
+        directory = os.path.join(self.root, key)
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            self._seq += 1
+            name = f'{int(captured_at * 1000)}-{self._seq}'
+        snapshot = dict(snapshot or {})
+        html = snapshot.pop('html', None)
+        files = {f'{name}.json': json.dumps(dict(snapshot, reason=reason, captured_at=captured_at)).encode('utf-8')}
+        if screenshot_b64:
+            files[f'{name}.jpg'] = base64.b64decode(screenshot_b64)
+        if html:
+            files[f'{name}.html'] = html.encode('utf-8')
+        for filename, data in files.items():
+            with open(os.path.join(directory, filename), 'wb') as f:
+                f.write(data)
+
+        # Keep only the newest artifacts per key
+        stems = sorted({f.rsplit('.', 1)[0] for f in os.listdir(directory)}, key=lambda s: int(s.split('-')[0]))
+        for stem in stems[:-self.max_per_key]:
+            for ext in ('json', 'jpg', 'html'):
+                path = os.path.join(directory, f'{stem}.{ext}')
+                if os.path.exists(path):
+                    os.remove(path)
+
+        size = sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory))
+        with self._lock:
+            self._sizes.pop(key, None)
+            self._sizes[key] = size
+            evict = []
+            total = sum(self._sizes.values())
+            while total > self.max_bytes and len(self._sizes) > 1:
+                old_key, old_size = self._sizes.popitem(last=False)
+                total -= old_size
+                evict.append(old_key)
+        for old_key in evict:
+            shutil.rmtree(os.path.join(self.root, old_key), ignore_errors=True)
+        logger.info(f"Saved diagnostics for {key}: {reason}")
+
+    def has(self, key):
+        with self._lock:
+            return safe_key(key) in self._sizes
+
+    def list(self, key):
+        """Artifacts stored for ``key``, oldest first"""
+        key = safe_key(key)
+        directory = os.path.join(self.root, key)
+        if not os.path.isdir(directory):
+            return []
+        artifacts = []
+        for filename in sorted(os.listdir(directory), key=lambda f: int(f.split('-')[0])):
+            if not filename.endswith('.json'):
+                continue
+            stem = filename[:-len('.json')]
+            try:
+                with open(os.path.join(directory, filename), 'r') as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for ext, field in (('jpg', 'screenshot'), ('html', 'dom')):
+                if os.path.exists(os.path.join(directory, f'{stem}.{ext}')):
+                    meta[field] = f'{stem}.{ext}'
+            artifacts.append(meta)
+        return artifacts
+
+    def directory(self, key):
+        return os.path.join(self.root, safe_key(key))
@@ -0,0 +1,202 @@
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from metrics import span
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no pooled session becomes available in time"""
+
+
+class PooledSession:
+    """A logged-in WellfoundAutomation plus the bookkeeping the pool needs"""
+
+    def __init__(self, automation):
+        self.automation = automation
+        self.created_at = time.monotonic()
+        self.uses = 0
+
+    def is_expired(self, max_uses, max_age):
+        if getattr(self.automation, 'recycle_reason', None):
+            return True
+        if max_uses and self.uses >= max_uses:
+            return True
+        if max_age and time.monotonic() - self.created_at >= max_age:
+            return True
+        return False
+
+
+class DriverPool:
+    """Bounded pool of pre-authenticated WellfoundAutomation sessions.
+
+    A background filler thread keeps ``size`` sessions alive. Sessions are
+    health-checked on checkout, recycled after ``max_uses`` messages or
+    ``max_age`` seconds, and replaced in the background when they crash.
+    """
+
+    def __init__(self, factory, size=2, max_uses=50, max_age=1800, checkout_timeout=60):
+        self.factory = factory
+        self.size = size
+        self.max_uses = max_uses
+        self.max_age = max_age
+        self.checkout_timeout = checkout_timeout
+
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._live = 0
+        self._creating = 0
+        self._last_error = None
+        self._closed = False
+        self._filler = None
+
+    def start(self):
+        with self._lock:
+            if self._filler is not None:
+                return
+            self._filler = threading.Thread(target=self._fill_loop, name='driver-pool-filler', daemon=True)
+            self._filler.start()
+        self._wakeup.set()
+
+    def _fill_loop(self):
+        backoff = 1
+        while not self._closed:
+            self._wakeup.wait(timeout=5)
+            self._wakeup.clear()
+            self._sweep()
+            while not self._closed:
+                with self._lock:
+                    if self._live + self._creating >= self.size:
+                        break
+                    self._creating += 1
+                try:
+                    automation = self.factory()
+                except Exception as e:
+                    with self._lock:
+                        self._creating -= 1
+                        self._last_error = e
+                    logger.error(f"Failed to create pooled session: {str(e)}")
+                    time.sleep(backoff)
+                    backoff = min(backoff * 2, 60)
+                    continue
+
+                backoff = 1
+                with self._lock:
+                    self._creating -= 1
+                    self._last_error = None
+                    if self._closed:
+                        self._close_automation(automation)
+                        break
+                    self._live += 1
+                self._idle.put(PooledSession(automation))
+                logger.info("Added warm session to driver pool")
+
+    def _sweep(self):
+        """Retire idle sessions that hit a limit while waiting, so they are replaced before anyone needs them"""
+        for _ in range(self._idle.qsize()):
+            try:
+                session = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            if session.is_expired(self.max_uses, self.max_age):
+                reason = getattr(session.automation, 'recycle_reason', None) or 'use/age limit'
+                logger.info(f"Recycling idle pooled session: {reason}")
+                self._retire(session)
+            else:
+                self._idle.put(session)
+
+    def checkout(self, timeout=None):
+        """Return a healthy PooledSession, waiting up to ``timeout`` seconds"""
+        if self._closed:
+            raise RuntimeError("Driver pool is closed")
+        self.start()
+
+        deadline = time.monotonic() + (timeout if timeout is not None else self.checkout_timeout)
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise PoolTimeoutError("Timed out waiting for a browser session")
+            try:
+                session = self._idle.get(timeout=min(remaining, 1))
+            except queue.Empty:
+                with self._lock:
+                    # Nothing alive and the last attempt failed: surface the real error
+                    if self._live == 0 and self._last_error is not None:
+                        raise self._last_error
+                continue
+
+            if session.is_expired(self.max_uses, self.max_age):
+                logger.info("Recycling pooled session after reaching its use/age limit")
+                self._retire(session)
+                continue
+            if not session.automation.is_alive():
+                logger.warning("Discarding unhealthy pooled session")
+                self._retire(session)
+                continue
+            if session.automation.needs_cookie_refresh():
+                logger.info("Re-applying updated cookies to pooled session")
+                if not session.automation.setup_with_specific_cookies():
+                    self._retire(session)
+                    continue
+            return session
+
+    def release(self, session, healthy=True):
+        session.uses += 1
+        if self._closed or not healthy or session.is_expired(self.max_uses, self.max_age):
+            self._retire(session)
+            return
+        self._idle.put(session)
+
+    @contextmanager
+    def session(self, timeout=None):
+        """Check out a session's automation for the duration of a ``with`` block"""
+        with span('pool_checkout'):
+            session = self.checkout(timeout)
+        healthy = True
+        try:
+            yield session.automation
+        except Exception:
+            healthy = False
+            raise
+        finally:
+            self.release(session, healthy=healthy)
+
+    def _retire(self, session):
+        with self._lock:
+            self._live -= 1
+        # Quitting Chrome can take a while, keep it off the caller's thread
+        threading.Thread(target=self._close_automation, args=(session.automation,), daemon=True).start()
+        self._wakeup.set()
+
+    @staticmethod
+    def _close_automation(automation):
+        try:
+            automation.close()
+        except Exception as e:
+            logger.error(f"Error closing pooled session: {str(e)}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': self.size,
+                'live': self._live,
+                'idle': self._idle.qsize(),
+                'creating': self._creating,
+                'last_error': str(self._last_error) if self._last_error else None,
+            }
+
+    def shutdown(self):
+        self._closed = True
+        self._wakeup.set()
+        while True:
+            try:
+                session = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._close_automation(session.automation)
+        logger.info("Driver pool shut down")
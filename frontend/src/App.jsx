@@ -2,6 +2,18 @@ import { useState } from 'react'
 import axios from 'axios'
 import './App.css'
 
+const STAGE_LABELS = {
+  queued: 'Message queued...',
+  driver_acquired: 'Browser session ready...',
+  authenticated: 'Signed in...',
+  page_loaded: 'Conversation opened...',
+  composer_found: 'Writing message...',
+  submitting: 'Sending...',
+  sent: 'Sent, waiting for confirmation...'
+}
+
+const TERMINAL_STAGES = ['succeeded', 'failed', 'interrupted']
+
 function App() {
   const [message_url, setMessage_url] = useState('')
   const [message, setMessage] = useState('')
@@ -35,6 +47,39 @@ function App() {
     }
   }
 
+  const pollJob = async (jobId) => {
+    for (;;) {
+      const { data } = await axios.get(`http://localhost:5000/jobs/${jobId}`)
+      if (data.status !== 'queued' && data.status !== 'running') {
+        return data
+      }
+      await new Promise(resolve => setTimeout(resolve, 1000))
+    }
+  }
+
+  // Follow the job's stage events as they happen; fall back to polling if the stream drops
+  const waitForJob = (jobId) => new Promise((resolve, reject) => {
+    const source = new EventSource(`http://localhost:5000/jobs/${jobId}/events`)
+    const finish = (event) => {
+      const data = JSON.parse(event.data)
+      source.close()
+      resolve({ status: data.stage, result: data.result, error: data.error })
+    }
+
+    Object.entries(STAGE_LABELS).forEach(([stage, label]) => {
+      source.addEventListener(stage, () => setStatus({ type: 'info', message: label }))
+    })
+    source.addEventListener('confirmed', (event) => {
+      const data = JSON.parse(event.data)
+      setStatus({ type: 'info', message: `Delivery confirmed in ${data.confirm_ms}ms` })
+    })
+    TERMINAL_STAGES.forEach(stage => source.addEventListener(stage, finish))
+    source.onerror = () => {
+      source.close()
+      pollJob(jobId).then(resolve, reject)
+    }
+  })
+
   const handleSubmit = async (e) => {
     e.preventDefault()
     setStatus({ type: 'info', message: 'Sending message...' })
@@ -50,6 +95,14 @@ function App() {
         }
       })
 
+      // The server queues the send and returns a job id right away; follow it until it finishes
+      setStatus({ type: 'info', message: 'Message queued, sending...' })
+      const job = await waitForJob(response.data.job_id)
+      if (job.status !== 'succeeded') {
+        setStatus({ type: 'error', message: `Failed to send message: ${job.error || job.status}` })
+        return
+      }
+
       setStatus({ type: 'success', message: 'Message sent successfully!' })
       setMessage_url('')
       setMessage('')
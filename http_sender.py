@@ -0,0 +1,123 @@
+import logging
+import re
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+logger = logging.getLogger(__name__)
+
+THREAD_ID_PATTERN = re.compile(r'/jobs/messages/([^/?#]+)')
+
+# Outcomes of HttpMessageSender.send
+SENT = 'sent'
+REJECTED = 'rejected'
+UNKNOWN = 'unknown'
+
+SEND_MESSAGE_MUTATION = """
+mutation SendMessage($threadId: ID!, $body: String!) {
+  sendMessage(input: {threadId: $threadId, body: $body}) {
+    message { id }
+  }
+}
+"""
+
+
+def thread_id_from_url(message_url):
+    """Extract the thread id from a /jobs/messages/<id> URL, or None"""
+    match = THREAD_ID_PATTERN.search(urlparse(message_url).path)
+    return match.group(1) if match else None
+
+
+def never_sent(error):
+    """True if a requests error happened before any of the request reached the server"""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(error, requests.ConnectionError) and isinstance(reason, NewConnectionError)
+
+
+class HttpMessageSender:
+    """Post messages straight to Wellfound's GraphQL endpoint with session cookies.
+
+    Uses a pooled keep-alive HTTP session. ``send`` returns REJECTED only
+    when the message certainly wasn't posted (a 4xx, a GraphQL error or a
+    failed connect), so the caller can fall back to the browser flow. Read
+    timeouts and 5xx responses return UNKNOWN: the message may have gone out.
+    Point ``base_url`` at a local stub server to exercise it offline.
+    """
+
+    def __init__(self, base_url='https://wellfound.com', graphql_path='/graphql', timeout=10, pool_size=4):
+        self.base_url = base_url.rstrip('/')
+        self.graphql_url = self.base_url + graphql_path
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+            'Accept': 'application/json',
+            'Content-Type': 'application/json',
+            'Origin': self.base_url,
+        })
+
+    def set_cookies(self, cookies):
+        """Replace the session's cookies with Selenium-style cookie dicts"""
+        self.session.cookies.clear()
+        for cookie in cookies:
+            self.session.cookies.set(
+                cookie['name'], cookie['value'],
+                domain=cookie.get('domain', ''), path=cookie.get('path', '/')
+            )
+
+    def send(self, message_url, message):
+        thread_id = thread_id_from_url(message_url)
+        if not thread_id:
+            return REJECTED
+
+        headers = {'Referer': message_url}
+        csrf = self.session.cookies.get('csrf_token') or self.session.cookies.get('XSRF-TOKEN')
+        if csrf:
+            headers['X-CSRF-Token'] = csrf
+
+        try:
+            response = self.session.post(
+                self.graphql_url,
+                json={
+                    'operationName': 'SendMessage',
+                    'query': SEND_MESSAGE_MUTATION,
+                    'variables': {'threadId': thread_id, 'body': message}
+                },
+                headers=headers,
+                timeout=self.timeout,
+                allow_redirects=False
+            )
+        except requests.RequestException as e:
+            logger.warning(f"HTTP send failed: {str(e)}")
+            return REJECTED if never_sent(e) else UNKNOWN
+
+        if response.status_code >= 500:
+            logger.warning(f"HTTP send failed with status {response.status_code}")
+            return UNKNOWN
+        if response.status_code != 200:
+            logger.warning(f"HTTP send rejected with status {response.status_code}")
+            return REJECTED
+        try:
+            body = response.json()
+        except ValueError:
+            logger.warning("HTTP send returned a non-JSON response")
+            return UNKNOWN
+        if body.get('errors'):
+            logger.warning(f"HTTP send rejected: {body.get('errors')}")
+            return REJECTED
+        if not (body.get('data') or {}).get('sendMessage'):
+            logger.warning("HTTP send returned no message")
+            return UNKNOWN
+
+        logger.info(f"Sent message to thread {thread_id} over HTTP")
+        return SENT
+
+    def close(self):
+        self.session.close()
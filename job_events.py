@@ -0,0 +1,71 @@
+import json
+import threading
+import time
+
+# A send job moves through queued, driver_acquired, authenticated, page_loaded,
+# composer_found, submitting, sent and confirmed, then ends with one of these
+TERMINAL = ('succeeded', 'failed', 'interrupted')
+
+
+class JobEvents:
+    """In-memory stage events per job, replayed to late subscribers.
+
+    Jobs keep their history for ``retention`` seconds after a terminal event
+    so a client that connects just after the send finished still sees it.
+    """
+
+    def __init__(self, retention=600):
+        self.retention = retention
+        self._cond = threading.Condition()
+        self._jobs = {}
+
+    def publish(self, job_id, stage, **data):
+        event = dict(data, stage=stage, job_id=job_id, at=time.time())
+        with self._cond:
+            record = self._jobs.setdefault(job_id, {'events': [], 'finished_at': None})
+            record['events'].append(event)
+            if stage in TERMINAL:
+                record['finished_at'] = event['at']
+            self._prune(event['at'])
+            self._cond.notify_all()
+
+    def _prune(self, now):
+        expired = [job_id for job_id, record in self._jobs.items()
+                   if record['finished_at'] and now - record['finished_at'] > self.retention]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def history(self, job_id):
+        with self._cond:
+            record = self._jobs.get(job_id)
+            return list(record['events']) if record else []
+
+    def subscribe(self, job_id, keepalive=15):
+        """Yield the job's events from the start, then live ones until a terminal event.
+
+        Yields None every ``keepalive`` seconds without news so the caller can
+        keep the connection open.
+        """
+        index = 0
+        while True:
+            with self._cond:
+                record = self._jobs.get(job_id)
+                if record is None or index >= len(record['events']):
+                    self._cond.wait(timeout=keepalive)
+                    record = self._jobs.get(job_id)
+                pending = record['events'][index:] if record else []
+            if not pending:
+                yield None
+                continue
+            for event in pending:
+                index += 1
+                yield event
+                if event['stage'] in TERMINAL:
+                    return
+
+
+def format_sse(event):
+    """Server-Sent Events framing for one event, or a comment line as keepalive"""
+    if event is None:
+        return ': keepalive\n\n'
+    return f"event: {event['stage']}\ndata: {json.dumps(event)}\n\n"
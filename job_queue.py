@@ -0,0 +1,391 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+import urllib.request
+import uuid
+
+from metrics import Counter, STAGE_SECONDS, set_trace_id
+from rate_limiter import recipient_key
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+INTERRUPTED = 'interrupted'
+
+JOBS_FINISHED = Counter('wellfound_jobs_total', 'Finished send jobs by outcome', labelnames=('status',))
+JOBS_REQUEUED = Counter('wellfound_jobs_requeued_total', 'Claimed jobs put back in the queue before sending')
+JOBS_DEDUPED = Counter('wellfound_jobs_deduplicated_total', 'Send requests answered from an existing job',
+                       labelnames=('match',))
+
+
+def dedupe_key(message_url, message):
+    """Hash of recipient and message body, so the same message to the same person is caught without a key"""
+    return hashlib.sha256(f'{recipient_key(message_url)}\n{message}'.encode('utf-8')).hexdigest()
+
+
+class IdempotencyConflictError(Exception):
+    """Raised when an idempotency key is reused for a different message"""
+
+
+class RequeueJob(Exception):
+    """Raised by a handler to put its job back in the queue; only safe before the send was submitted"""
+
+
+class JobStore:
+    """SQLite-backed job table so queued work survives a restart.
+
+    It doubles as the send outbox: jobs are indexed by idempotency key and by
+    a hash of recipient and message, and ``submitted_at`` records the moment a
+    send passed the point of no return, which is what restart reconciliation
+    relies on.
+    """
+
+    def __init__(self, path='wellfound_jobs.db'):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                webhook_url TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            )
+        ''')
+        columns = [row['name'] for row in self._conn.execute('PRAGMA table_info(jobs)')]
+        if 'priority' not in columns:
+            self._conn.execute('ALTER TABLE jobs ADD COLUMN priority INTEGER NOT NULL DEFAULT 0')
+        for column in ('idempotency_key TEXT', 'dedupe_key TEXT', 'submitted_at REAL'):
+            if column.split()[0] not in columns:
+                self._conn.execute(f'ALTER TABLE jobs ADD COLUMN {column}')
+        if 'account' not in columns:
+            # Processes sharing the database may serve different accounts, so claims filter on it
+            self._conn.execute('ALTER TABLE jobs ADD COLUMN account TEXT')
+            self._conn.execute("UPDATE jobs SET account = COALESCE(json_extract(payload, '$.account'), 'default')")
+        if 'recipient' not in columns:
+            self._conn.execute('ALTER TABLE jobs ADD COLUMN recipient TEXT')
+            rows = self._conn.execute('SELECT id, payload FROM jobs WHERE status = ?', (QUEUED,)).fetchall()
+            for row in rows:
+                self._conn.execute('UPDATE jobs SET recipient = ? WHERE id = ?',
+                                   (recipient_key(json.loads(row['payload'])['message_url']), row['id']))
+        self._conn.execute(
+            'CREATE UNIQUE INDEX IF NOT EXISTS jobs_idempotency ON jobs (idempotency_key) WHERE idempotency_key IS NOT NULL'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS jobs_dedupe ON jobs (dedupe_key, created_at)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS jobs_lane ON jobs (status, priority DESC, created_at)')
+        self._conn.execute(
+            'CREATE INDEX IF NOT EXISTS jobs_recipient ON jobs (status, account, recipient, priority DESC, created_at)'
+        )
+
+    @staticmethod
+    def _to_dict(row):
+        if row is None:
+            return None
+        job = dict(row)
+        job['payload'] = json.loads(job['payload'])
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    def create(self, payload, webhook_url=None, priority=0, idempotency_key=None, dedupe_key=None,
+               dedupe_window=0):
+        """Insert a queued job, or return an existing one it duplicates.
+
+        Returns ``(job, created)``. A job with the same ``idempotency_key`` is
+        always returned (raising IdempotencyConflictError if it was for a
+        different message); otherwise a job with the same ``dedupe_key``
+        created within ``dedupe_window`` seconds that hasn't failed is returned.
+        """
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            # Take the write lock before looking, so another process sharing the
+            # database can't insert the same key between the check and the insert
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                existing = self._find_duplicate(idempotency_key, dedupe_key, dedupe_window, now)
+                if existing is None:
+                    self._conn.execute(
+                        'INSERT INTO jobs (id, status, payload, webhook_url, priority, idempotency_key, dedupe_key, '
+                        'account, recipient, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                        (job_id, QUEUED, json.dumps(payload), webhook_url, priority, idempotency_key, dedupe_key,
+                         payload.get('account', 'default'), recipient_key(payload['message_url']), now, now)
+                    )
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
+        if existing is not None:
+            return existing, False
+        return self.get(job_id), True
+
+    def _find_duplicate(self, idempotency_key, dedupe_key, dedupe_window, now):
+        if idempotency_key:
+            row = self._conn.execute('SELECT * FROM jobs WHERE idempotency_key = ?', (idempotency_key,)).fetchone()
+            if row is not None:
+                if dedupe_key and row['dedupe_key'] and row['dedupe_key'] != dedupe_key:
+                    raise IdempotencyConflictError('Idempotency key was already used for a different message')
+                JOBS_DEDUPED.inc(match='idempotency_key')
+                return self._to_dict(row)
+        if dedupe_key and dedupe_window:
+            row = self._conn.execute(
+                'SELECT * FROM jobs WHERE dedupe_key = ? AND created_at >= ? AND status != ? '
+                'ORDER BY created_at DESC LIMIT 1',
+                (dedupe_key, now - dedupe_window, FAILED)
+            ).fetchone()
+            if row is not None:
+                JOBS_DEDUPED.inc(match='message')
+                return self._to_dict(row)
+        return None
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return self._to_dict(row)
+
+    def claim_next(self, admit=None, accounts=None, scan=50):
+        """Atomically move the next admissible queued job to running.
+
+        Only the head job of each (account, recipient) lane is considered, by
+        priority then age: if a recipient's head is throttled, so is the rest
+        of its backlog. ``admit(job)`` returns 0 to accept a job or the seconds
+        until it could be accepted, and heads are paged through ``scan`` at a
+        time until one is admitted, so however many jobs a throttled recipient
+        has queued, other recipients are still reached. With
+        ``accounts``, only jobs for those accounts are claimed, leaving the
+        rest to the processes that serve them. Returns ``(job, None)`` or
+        ``(None, seconds until a job may become admissible)``.
+        """
+        now = time.time()
+        retry_in = None
+        where = 'status = ?'
+        params = [QUEUED]
+        if accounts is not None:
+            where += f" AND account IN ({', '.join('?' for _ in accounts)})"
+            params += list(accounts)
+        query = (
+            'SELECT * FROM (SELECT *, ROW_NUMBER() OVER ('
+            'PARTITION BY account, recipient ORDER BY priority DESC, created_at) AS lane_position '
+            f'FROM jobs WHERE {where}) WHERE lane_position = 1 '
+            'ORDER BY priority DESC, created_at LIMIT ? OFFSET ?'
+        )
+        offset = 0
+        with self._lock:
+            while True:
+                rows = self._conn.execute(query, params + [scan, offset]).fetchall()
+                for row in rows:
+                    job = self._to_dict(row)
+                    job.pop('lane_position')
+                    delay = admit(job) if admit else 0
+                    if delay > 0:
+                        retry_in = delay if retry_in is None else min(retry_in, delay)
+                        continue
+                    claimed = self._conn.execute(
+                        'UPDATE jobs SET status = ?, started_at = ?, updated_at = ? WHERE id = ? AND status = ?',
+                        (RUNNING, now, now, job['id'], QUEUED)
+                    ).rowcount
+                    if not claimed:
+                        # Another process sharing the database claimed it first
+                        continue
+                    job.update(status=RUNNING, started_at=now, updated_at=now)
+                    return job, None
+                if len(rows) < scan:
+                    return None, retry_in
+                offset += scan
+
+    def finish(self, job_id, status, result=None, error=None):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, updated_at = ? WHERE id = ?',
+                (status, json.dumps(result) if result is not None else None, error, now, now, job_id)
+            )
+        return self.get(job_id)
+
+    def requeue(self, job_id):
+        """Return a claimed job to the queue, unless it already submitted its message"""
+        now = time.time()
+        with self._lock:
+            return self._conn.execute(
+                'UPDATE jobs SET status = ?, started_at = NULL, updated_at = ? '
+                'WHERE id = ? AND status = ? AND submitted_at IS NULL',
+                (QUEUED, now, job_id, RUNNING)
+            ).rowcount > 0
+
+    def mark_submitted(self, job_id):
+        """Record that the send was handed to Wellfound; from here a retry could double-send"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'UPDATE jobs SET submitted_at = ?, updated_at = ? WHERE id = ? AND submitted_at IS NULL',
+                (now, now, job_id)
+            )
+
+    def reconcile(self, accounts=None):
+        """Settle jobs left running by a crash.
+
+        Jobs that never reached the send click are requeued. Jobs that did may
+        or may not have been delivered, so they are marked interrupted rather
+        than resent. With ``accounts``, only those accounts' jobs are touched;
+        the rest may be running in another process. Returns
+        ``(requeued, interrupted)``.
+        """
+        now = time.time()
+        where = 'status = ?'
+        params = [RUNNING]
+        if accounts is not None:
+            where += f" AND account IN ({', '.join('?' for _ in accounts)})"
+            params += list(accounts)
+        with self._lock:
+            requeued = self._conn.execute(
+                f'UPDATE jobs SET status = ?, started_at = NULL, updated_at = ? WHERE {where} AND submitted_at IS NULL',
+                [QUEUED, now] + params
+            ).rowcount
+            interrupted = self._conn.execute(
+                f'UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE {where}',
+                [INTERRUPTED, 'Interrupted by a restart after the message was submitted', now] + params
+            ).rowcount
+        return requeued, interrupted
+
+    def count(self, status):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM jobs WHERE status = ?', (status,)).fetchone()[0]
+
+
+class JobQueue:
+    """Worker pool that drains the job store through ``handler``.
+
+    ``handler(job)`` returns a JSON-serialisable result on success and raises
+    on failure, or raises RequeueJob to hand the job back to the queue. When a
+    job has a ``webhook_url`` the finished job is POSTed to it.
+    """
+
+    def __init__(self, handler, store, concurrency=2, webhook_timeout=10, limiter=None, events=None, accounts=None):
+        self.handler = handler
+        self.store = store
+        # Accounts this process can send from; None claims every job
+        self.accounts = accounts
+        self.limiter = limiter
+        self.events = events
+        self.concurrency = concurrency
+        # Moving average of job run time, used to estimate how long the backlog takes to drain
+        self.avg_job_seconds = 10.0
+        self.webhook_timeout = webhook_timeout
+        self._wakeup = threading.Condition()
+        self._workers = []
+        self._stopped = False
+
+    def start(self):
+        requeued, interrupted = self.store.reconcile(self.accounts)
+        if requeued:
+            logger.info(f"Requeued {requeued} jobs that had not been submitted before restart")
+        if interrupted:
+            logger.warning(f"Marked {interrupted} submitted jobs as interrupted after restart")
+        for i in range(self.concurrency):
+            worker = threading.Thread(target=self._work, name=f'send-worker-{i}', daemon=True)
+            worker.start()
+            self._workers.append(worker)
+        logger.info(f"Started {self.concurrency} send workers")
+
+    def submit(self, payload, webhook_url=None, priority=0, idempotency_key=None, dedupe_window=0):
+        """Queue a send; returns ``(job, created)`` where ``created`` is False for a duplicate"""
+        job, created = self.store.create(
+            payload, webhook_url, priority, idempotency_key=idempotency_key,
+            dedupe_key=dedupe_key(payload['message_url'], payload['message']), dedupe_window=dedupe_window
+        )
+        if created:
+            self.publish(job['id'], QUEUED)
+            with self._wakeup:
+                self._wakeup.notify()
+        return job, created
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def estimated_wait(self, queued=None):
+        """Rough seconds until a job queued now would start"""
+        queued = self.store.count(QUEUED) if queued is None else queued
+        return queued * self.avg_job_seconds / max(1, self.concurrency)
+
+    def publish(self, job_id, stage, **data):
+        """Forward a stage event for ``job_id`` to the event stream, if there is one"""
+        if self.events:
+            self.events.publish(job_id, stage, **data)
+
+    def _admit(self, job):
+        return self.limiter.try_acquire(
+            job['payload'].get('account', 'default'), recipient_key(job['payload']['message_url'])
+        )
+
+    def _work(self):
+        while not self._stopped:
+            job, retry_in = self.store.claim_next(self._admit if self.limiter else None, accounts=self.accounts)
+            if job is None:
+                with self._wakeup:
+                    self._wakeup.wait(timeout=min(retry_in or 1, 1))
+                continue
+            if self.limiter:
+                self.limiter.pace()
+            self._run(job)
+
+    def _run(self, job):
+        set_trace_id(job['payload'].get('trace_id') or job['id'])
+        STAGE_SECONDS.observe(job['started_at'] - job['created_at'], stage='queue_wait')
+        logger.info(f"Running job {job['id']}")
+        try:
+            result = self.handler(job)
+            job = self.store.finish(job['id'], SUCCEEDED, result=result)
+            logger.info(f"Job {job['id']} succeeded")
+        except RequeueJob as e:
+            if self.store.requeue(job['id']):
+                logger.warning(f"Job {job['id']} requeued: {str(e)}")
+                JOBS_REQUEUED.inc()
+                if self.limiter:
+                    self.limiter.refund(
+                        job['payload'].get('account', 'default'), recipient_key(job['payload']['message_url'])
+                    )
+                self.publish(job['id'], QUEUED)
+                return
+            logger.error(f"Job {job['id']} could not be requeued: {str(e)}")
+            job = self.store.finish(job['id'], FAILED, error=str(e))
+        except Exception as e:
+            logger.error(f"Job {job['id']} failed: {str(e)}")
+            job = self.store.finish(job['id'], FAILED, error=str(e))
+        JOBS_FINISHED.inc(status=job['status'])
+        if job['finished_at'] and job['started_at']:
+            self.avg_job_seconds = 0.8 * self.avg_job_seconds + 0.2 * (job['finished_at'] - job['started_at'])
+        self.publish(job['id'], job['status'], result=job['result'], error=job['error'])
+        if job.get('webhook_url'):
+            threading.Thread(target=self._notify, args=(job,), daemon=True).start()
+
+    def _notify(self, job):
+        try:
+            request = urllib.request.Request(
+                job['webhook_url'],
+                data=json.dumps(job).encode('utf-8'),
+                headers={'Content-Type': 'application/json'},
+                method='POST'
+            )
+            with urllib.request.urlopen(request, timeout=self.webhook_timeout) as response:
+                logger.info(f"Webhook for job {job['id']} returned {response.status}")
+        except Exception as e:
+            logger.error(f"Webhook for job {job['id']} failed: {str(e)}")
+
+    def stop(self):
+        self._stopped = True
+        with self._wakeup:
+            self._wakeup.notify_all()
@@ -0,0 +1,229 @@
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import namedtuple
+
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+
+from metrics import SELECTOR_MISSES, SELECTOR_SECONDS
+
+logger = logging.getLogger(__name__)
+
+Selector = namedtuple('Selector', ['kind', 'value'])
+
+# jQuery/Playwright-only pseudo classes that document.querySelector rejects
+UNSUPPORTED_CSS = re.compile(
+    r':(contains|has-text|text|eq)\(|:(first|last|visible)(?![\w-])', re.IGNORECASE
+)
+
+# Evaluates every candidate in a single round trip and returns
+# [index of first match or -1, element or null, indices of invalid selectors]
+FIND_FIRST_SCRIPT = """
+var selectors = arguments[0], clickable = arguments[1];
+var invalid = [];
+function usable(el) {
+    if (!clickable) return true;
+    if (el.disabled || el.getClientRects().length === 0) return false;
+    var style = window.getComputedStyle(el);
+    return style.visibility !== 'hidden' && style.pointerEvents !== 'none';
+}
+for (var i = 0; i < selectors.length; i++) {
+    var kind = selectors[i][0], value = selectors[i][1], el = null;
+    try {
+        if (kind === 'xpath') {
+            el = document.evaluate(value, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+        } else {
+            el = document.querySelector(value);
+        }
+    } catch (e) {
+        invalid.push(i);
+        continue;
+    }
+    if (el && usable(el)) return [i, el, invalid];
+}
+return [-1, null, invalid];
+"""
+
+
+def compile_selector(value):
+    """Classify a selector as CSS or XPath, raising ValueError if it can never match"""
+    value = value.strip()
+    if not value:
+        raise ValueError("Empty selector")
+    if value.startswith('/') or value.startswith('('):
+        return Selector('xpath', value)
+    if UNSUPPORTED_CSS.search(value):
+        raise ValueError(f"Unsupported CSS pseudo-class in selector: {value}")
+    return Selector('css', value)
+
+
+class SelectorStats:
+    """Persistent per-element record of which selector wins and how fast.
+
+    Each winning lookup bumps a decayed score for its selector, so when
+    Wellfound's DOM changes the new winner overtakes the old one within a few
+    sends. Stats are flushed to ``path`` at most every ``flush_interval`` seconds.
+    """
+
+    DECAY = 0.8
+
+    def __init__(self, path='selector_stats.json', flush_interval=30):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._dirty = False
+        self._data = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    self._data = json.load(f)
+            except Exception as e:
+                logger.error(f"Error loading selector stats: {str(e)}")
+
+    def _element(self, name):
+        return self._data.setdefault(name, {'lookups': 0, 'misses': 0, 'selectors': {}})
+
+    def rank(self, name, selectors):
+        """Order selectors by score, keeping the declared order for ties"""
+        with self._lock:
+            known = self._data.get(name, {}).get('selectors', {})
+            scores = {s.value: known.get(s.value, {}).get('score', 0) for s in selectors}
+        return sorted(selectors, key=lambda s: -scores[s.value])
+
+    def record_hit(self, name, selector, elapsed_ms):
+        with self._lock:
+            element = self._element(name)
+            element['lookups'] += 1
+            for entry in element['selectors'].values():
+                entry['score'] *= self.DECAY
+            entry = element['selectors'].setdefault(
+                selector, {'hits': 0, 'total_ms': 0.0, 'score': 0.0, 'last_hit': None}
+            )
+            entry['hits'] += 1
+            entry['total_ms'] += elapsed_ms
+            entry['score'] += 1
+            entry['last_hit'] = time.time()
+            self._dirty = True
+        self._maybe_flush()
+
+    def record_miss(self, name):
+        with self._lock:
+            element = self._element(name)
+            element['lookups'] += 1
+            element['misses'] += 1
+            self._dirty = True
+        self._maybe_flush()
+
+    def snapshot(self):
+        """Hit rates and average latencies per element, winners first"""
+        with self._lock:
+            result = {}
+            for name, element in self._data.items():
+                lookups = element['lookups'] or 1
+                selectors = []
+                for value, entry in sorted(element['selectors'].items(), key=lambda kv: -kv[1]['score']):
+                    selectors.append({
+                        'selector': value,
+                        'hits': entry['hits'],
+                        'hit_rate': round(entry['hits'] / lookups, 3),
+                        'avg_ms': round(entry['total_ms'] / entry['hits'], 1) if entry['hits'] else None,
+                        'last_hit': entry['last_hit'],
+                    })
+                result[name] = {
+                    'lookups': element['lookups'],
+                    'miss_rate': round(element['misses'] / lookups, 3),
+                    'selectors': selectors,
+                }
+            return result
+
+    def _maybe_flush(self):
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps(self._data)
+            self._dirty = False
+            self._last_flush = time.monotonic()
+        try:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"Error saving selector stats: {str(e)}")
+
+
+class LocatorGroup:
+    """A named set of fallback selectors for one element, raced in a single wait"""
+
+    def __init__(self, name, selectors, stats=None):
+        self.name = name
+        self.stats = stats
+        self._lock = threading.Lock()
+        self.selectors = []
+        for value in selectors:
+            try:
+                self.selectors.append(compile_selector(value))
+            except ValueError as e:
+                logger.warning(f"Rejected selector for {name}: {str(e)}")
+
+    def _reject(self, selectors):
+        with self._lock:
+            for selector in selectors:
+                if selector in self.selectors:
+                    self.selectors.remove(selector)
+                    logger.warning(f"Rejected invalid selector for {self.name}: {selector.value}")
+
+    def probe(self, driver, clickable=False):
+        """Check all candidates once; return (selector, element) or (None, None)"""
+        with self._lock:
+            selectors = list(self.selectors)
+        if self.stats:
+            selectors = self.stats.rank(self.name, selectors)
+        index, element, invalid = driver.execute_script(
+            FIND_FIRST_SCRIPT, [list(s) for s in selectors], clickable
+        )
+        if invalid:
+            self._reject([selectors[i] for i in invalid])
+        if index < 0:
+            return None, None
+        return selectors[index], element
+
+    def find(self, driver, timeout=15, clickable=False):
+        """Poll all candidates together until one matches; return the element or None"""
+        found = {}
+        started = time.monotonic()
+
+        def condition(d):
+            selector, element = self.probe(d, clickable)
+            if element is None:
+                return False
+            found['selector'] = selector
+            return element
+
+        try:
+            element = WebDriverWait(driver, timeout, poll_frequency=0.1).until(condition)
+        except TimeoutException:
+            logger.warning(f"No selector matched for {self.name} within {timeout}s")
+            SELECTOR_MISSES.inc(element=self.name)
+            if self.stats:
+                self.stats.record_miss(self.name)
+            return None
+        elapsed = time.monotonic() - started
+        SELECTOR_SECONDS.observe(elapsed, element=self.name)
+        if self.stats:
+            self.stats.record_hit(self.name, found['selector'].value, elapsed * 1000)
+        logger.info(f"Located {self.name} with {found['selector'].value}")
+        return element
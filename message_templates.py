@@ -0,0 +1,136 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+from session_store import write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+# {{ name }} or {{ name | fallback text }}
+PLACEHOLDER = re.compile(r'\{\{\s*([A-Za-z_][A-Za-z0-9_]*)\s*(?:\|([^{}]*))?\}\}')
+TEMPLATE_NAME = re.compile(r'^[A-Za-z0-9_.-]{1,100}$')
+
+
+class TemplateError(ValueError):
+    """A template that doesn't parse, or variables that don't fill it"""
+
+
+class MessageTemplate:
+    """A message body compiled once into literal text and placeholders.
+
+    Placeholders are plain names, so rendering can never reach attributes or
+    run code the way ``str.format`` or a full template engine could.
+    """
+
+    def __init__(self, name, body):
+        self.name = name
+        self.body = body
+        self.parts = []
+        position = 0
+        for match in PLACEHOLDER.finditer(body):
+            self._literal(body[position:match.start()])
+            default = match.group(2)
+            self.parts.append((match.group(1), default.strip() if default is not None else None))
+            position = match.end()
+        self._literal(body[position:])
+        self.variables = sorted({part[0] for part in self.parts if isinstance(part, tuple)})
+        self.required = sorted({part[0] for part in self.parts if isinstance(part, tuple) and part[1] is None})
+
+    def _literal(self, text):
+        if '{{' in text or '}}' in text:
+            raise TemplateError(f"Template {self.name} has a malformed placeholder near {text[:40]!r}")
+        if text:
+            self.parts.append(text)
+
+    def render(self, variables):
+        if variables is not None and not isinstance(variables, dict):
+            raise TemplateError('Variables must be an object')
+        variables = variables or {}
+        missing = [name for name in self.required if variables.get(name) in (None, '')]
+        if missing:
+            raise TemplateError(f"Missing variables: {', '.join(missing)}")
+        out = []
+        for part in self.parts:
+            if isinstance(part, str):
+                out.append(part)
+            else:
+                value = variables.get(part[0])
+                out.append(str(value) if value not in (None, '') else part[1])
+        message = ''.join(out).strip()
+        if not message:
+            raise TemplateError('Rendered message is empty')
+        return message
+
+    def render_many(self, variable_sets):
+        """Render every variable set; returns (messages, errors) with errors as (index, message)"""
+        messages, errors = [], []
+        for index, variables in enumerate(variable_sets):
+            try:
+                messages.append(self.render(variables))
+            except TemplateError as e:
+                messages.append(None)
+                errors.append((index, str(e)))
+        return messages, errors
+
+    def to_dict(self):
+        return {'name': self.name, 'body': self.body, 'variables': self.variables, 'required': self.required}
+
+
+class TemplateStore:
+    """Named message templates persisted to ``path`` and kept compiled in memory"""
+
+    def __init__(self, path='templates.json'):
+        self.path = path
+        self._lock = threading.Lock()
+        self._templates = {}
+        self._updated = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    stored = json.load(f)
+                for name, record in stored.items():
+                    self._templates[name] = MessageTemplate(name, record['body'])
+                    self._updated[name] = record.get('updated_at')
+                logger.info(f"Loaded {len(self._templates)} message templates from {path}")
+            except Exception as e:
+                logger.error(f"Error loading templates from {path}: {str(e)}")
+
+    def get(self, name):
+        with self._lock:
+            return self._templates.get(name)
+
+    def all(self):
+        with self._lock:
+            return [dict(t.to_dict(), updated_at=self._updated.get(n)) for n, t in sorted(self._templates.items())]
+
+    def put(self, name, body):
+        """Compile and store a template; raises TemplateError if it doesn't parse"""
+        if not TEMPLATE_NAME.match(name or ''):
+            raise TemplateError('Template names may only contain letters, digits, ".", "_" and "-"')
+        if not isinstance(body, str):
+            raise TemplateError('Template body must be a string')
+        if not body.strip():
+            raise TemplateError('Template body is empty')
+        template = MessageTemplate(name, body)
+        with self._lock:
+            self._templates[name] = template
+            self._updated[name] = time.time()
+            self._persist()
+        return template
+
+    def delete(self, name):
+        with self._lock:
+            if self._templates.pop(name, None) is None:
+                return False
+            self._updated.pop(name, None)
+            self._persist()
+        return True
+
+    def _persist(self):
+        if self.path:
+            write_json_atomic(self.path, {
+                name: {'body': t.body, 'updated_at': self._updated.get(name)} for name, t in self._templates.items()
+            })
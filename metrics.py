@@ -0,0 +1,183 @@
+import contextvars
+import functools
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 15, 30, 60)
+
+_registry = []
+_trace_id = contextvars.ContextVar('trace_id', default='-')
+
+
+def new_trace_id():
+    return uuid.uuid4().hex[:16]
+
+
+def set_trace_id(trace_id):
+    """Tag every log line from the current thread/context with ``trace_id``"""
+    return _trace_id.set(trace_id or '-')
+
+
+def get_trace_id():
+    return _trace_id.get()
+
+
+def install_log_trace_ids():
+    """Add a ``trace_id`` attribute to every LogRecord so formats can use %(trace_id)s"""
+    factory = logging.getLogRecordFactory()
+    if getattr(factory, 'adds_trace_id', False):
+        return
+
+    def record_factory(*args, **kwargs):
+        record = factory(*args, **kwargs)
+        record.trace_id = _trace_id.get()
+        return record
+
+    record_factory.adds_trace_id = True
+    logging.setLogRecordFactory(record_factory)
+
+
+def _format_labels(labelnames, values):
+    if not labelnames:
+        return ''
+    pairs = ','.join(f'{name}="{value}"' for name, value in zip(labelnames, values))
+    return '{' + pairs + '}'
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.labelnames, key)} {value}')
+        return lines
+
+
+class Gauge:
+    """Gauge whose value is read from ``function`` at scrape time"""
+
+    def __init__(self, name, documentation, function):
+        self.name = name
+        self.documentation = documentation
+        self.function = function
+        _registry.append(self)
+
+    def render(self):
+        try:
+            value = self.function()
+        except Exception as e:
+            logger.warning(f"Could not read gauge {self.name}: {str(e)}")
+            return []
+        if value is None:
+            return []
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} gauge', f'{self.name} {value}']
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._values = {}
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            counts, total, count = self._values.get(key, ([0] * len(self.buckets), 0.0, 0))
+            # Buckets are cumulative: each observation lands in every bucket it fits under
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        names = self.labelnames + ('le',)
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._values.items()):
+                for bound, bucket_count in zip(self.buckets, counts):
+                    lines.append(f'{self.name}_bucket{_format_labels(names, key + (bound,))} {bucket_count}')
+                lines.append(f'{self.name}_bucket{_format_labels(names, key + ("+Inf",))} {count}')
+                lines.append(f'{self.name}_sum{_format_labels(self.labelnames, key)} {round(total, 6)}')
+                lines.append(f'{self.name}_count{_format_labels(self.labelnames, key)} {count}')
+        return lines
+
+
+def render():
+    """All registered metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+STAGE_SECONDS = Histogram(
+    'wellfound_stage_duration_seconds',
+    'Time spent in each stage of a WellfoundAutomation session',
+    labelnames=('stage',)
+)
+STAGE_FAILURES = Counter(
+    'wellfound_stage_failures_total',
+    'Stages that raised or reported failure',
+    labelnames=('stage',)
+)
+SELECTOR_SECONDS = Histogram(
+    'wellfound_selector_lookup_seconds',
+    'Time to locate each page element',
+    labelnames=('element',)
+)
+SELECTOR_MISSES = Counter(
+    'wellfound_selector_misses_total',
+    'Element lookups where no selector matched',
+    labelnames=('element',)
+)
+
+
+@contextmanager
+def span(stage):
+    """Time a block as ``stage``; exceptions count as failures"""
+    started = time.monotonic()
+    try:
+        yield
+    except Exception:
+        STAGE_FAILURES.inc(stage=stage)
+        raise
+    finally:
+        elapsed = time.monotonic() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        logger.info(f"Stage {stage} took {elapsed * 1000:.0f}ms")
+
+
+def timed(stage):
+    """Decorator form of span; a False return value also counts as a failure"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                result = func(*args, **kwargs)
+            if result is False:
+                STAGE_FAILURES.inc(stage=stage)
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,141 @@
+import logging
+import random
+import threading
+import time
+
+from metrics import Counter, STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+THROTTLED = Counter('wellfound_rate_limited_total', 'Rate limit checks that deferred a send', labelnames=('scope',))
+
+PRIORITIES = {'high': 10, 'normal': 0, 'low': -10}
+
+
+def parse_priority(value):
+    """Map 'high'/'normal'/'low' or an integer to a numeric priority lane"""
+    if value is None or value == '':
+        return 0
+    if isinstance(value, str) and value.lower() in PRIORITIES:
+        return PRIORITIES[value.lower()]
+    return int(value)
+
+
+def recipient_key(message_url):
+    """Bucket key for a recipient: the URL without query, fragment or trailing slash"""
+    return message_url.split('#', 1)[0].split('?', 1)[0].rstrip('/').lower()
+
+
+class TokenBucket:
+    """Classic token bucket: ``rate`` tokens per second up to ``burst``"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        # ``now`` may predate a bucket created after the caller read the clock
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, now):
+        """Seconds until a token is available (0 if one is available now)"""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+    def give_back(self):
+        self.tokens = min(self.burst, self.tokens + 1)
+
+    def is_full(self, now):
+        self._refill(now)
+        return self.tokens >= self.burst
+
+
+class RateLimiter:
+    """Global, per-account and per-recipient token buckets checked together.
+
+    ``try_acquire`` only consumes tokens when every bucket has one, so a busy
+    recipient never burns global or account capacity. Rates are per minute;
+    0 disables that scope.
+    """
+
+    MAX_RECIPIENT_BUCKETS = 10000
+
+    def __init__(self, global_per_minute=60, account_per_minute=30, recipient_per_minute=1,
+                 burst=5, jitter=0.5):
+        self.global_per_minute = global_per_minute
+        self.account_per_minute = account_per_minute
+        self.recipient_per_minute = recipient_per_minute
+        self.burst = burst
+        self.jitter = jitter
+        self._lock = threading.Lock()
+        self._global = TokenBucket(global_per_minute / 60, burst) if global_per_minute else None
+        self._accounts = {}
+        self._recipients = {}
+
+    def _buckets(self, account, recipient):
+        buckets = []
+        if self._global:
+            buckets.append(('global', self._global))
+        if self.account_per_minute:
+            if account not in self._accounts:
+                self._accounts[account] = TokenBucket(self.account_per_minute / 60, self.burst)
+            buckets.append(('account', self._accounts[account]))
+        if self.recipient_per_minute and recipient:
+            if recipient not in self._recipients:
+                self._prune_recipients()
+                self._recipients[recipient] = TokenBucket(self.recipient_per_minute / 60, 1)
+            buckets.append(('recipient', self._recipients[recipient]))
+        return buckets
+
+    def _prune_recipients(self):
+        if len(self._recipients) < self.MAX_RECIPIENT_BUCKETS:
+            return
+        now = time.monotonic()
+        # A full bucket holds no state worth keeping
+        for key in [k for k, bucket in self._recipients.items() if bucket.is_full(now)]:
+            del self._recipients[key]
+
+    def try_acquire(self, account='default', recipient=None):
+        """Take a token from every applicable bucket, or return the seconds to wait"""
+        with self._lock:
+            now = time.monotonic()
+            buckets = self._buckets(account, recipient)
+            waits = [(bucket.wait_time(now), scope) for scope, bucket in buckets]
+            delay, scope = max(waits, default=(0.0, None))
+            if delay > 0:
+                THROTTLED.inc(scope=scope)
+                return delay
+            for _, bucket in buckets:
+                bucket.take()
+            return 0.0
+
+    def refund(self, account='default', recipient=None):
+        """Return the tokens of an acquire whose send never happened"""
+        with self._lock:
+            for _, bucket in self._buckets(account, recipient):
+                bucket.give_back()
+
+    def pace(self):
+        """Sleep a random jitter so sends aren't evenly spaced"""
+        if self.jitter:
+            time.sleep(random.uniform(0, self.jitter))
+
+    def acquire(self, account='default', recipient=None):
+        """Block until a send is allowed, then sleep a random jitter so sends aren't evenly spaced"""
+        started = time.monotonic()
+        while True:
+            delay = self.try_acquire(account, recipient)
+            if delay <= 0:
+                break
+            time.sleep(min(delay, 5))
+        self.pace()
+        STAGE_SECONDS.observe(time.monotonic() - started, stage='rate_limit_wait')
@@ -0,0 +1,141 @@
+import logging
+import threading
+import time
+
+import requests
+
+from metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+SESSION_CHECKS = Counter('wellfound_session_checks_total', 'Background session probes by outcome',
+                         labelnames=('account', 'result'))
+SESSION_REFRESHES = Counter('wellfound_session_refreshes_total', 'Background re-logins by outcome',
+                            labelnames=('account', 'result'))
+
+VALID = 'valid'
+EXPIRED = 'expired'
+INCONCLUSIVE = 'inconclusive'
+
+
+def probe_session(base_url, cookies, path='/inbox', timeout=10):
+    """Request a logged-in page with ``cookies`` and classify the answer.
+
+    Only the status decides: a redirect to the login page or a 401 means the
+    session is dead, a 2xx means it is alive. Page bodies are not inspected,
+    since logged-in pages may embed login markup in their scripts. Anything
+    else (bot challenges, 5xx, network errors) is inconclusive and leaves the
+    session's state alone.
+    """
+    try:
+        response = requests.get(
+            base_url.rstrip('/') + path,
+            cookies={c['name']: c['value'] for c in cookies},
+            allow_redirects=False,
+            timeout=timeout,
+            headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+                                   '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'}
+        )
+    except requests.RequestException as e:
+        logger.warning(f"Session probe failed: {str(e)}")
+        return INCONCLUSIVE
+    if response.is_redirect:
+        return EXPIRED if 'login' in response.headers.get('Location', '').lower() else INCONCLUSIVE
+    if response.status_code == 401:
+        return EXPIRED
+    if 200 <= response.status_code < 300:
+        return VALID
+    return INCONCLUSIVE
+
+
+class SessionHealthChecker:
+    """Probes every account's stored session on a schedule, ahead of any send.
+
+    Good sessions are marked verified, so pooled drivers skip their own
+    login check. Dead ones are marked invalid, which takes the account out of
+    the send rotation, and ``refresh(account)`` is called to log in again. A
+    failed refresh isn't retried for ``refresh_backoff`` seconds so a bad
+    password doesn't hammer the login page. ``fallback(account)`` returns the
+    cookies drivers use when the store is empty, if any, so an account that
+    runs on them isn't taken for logged out.
+    """
+
+    def __init__(self, accounts, base_url, refresh=None, fallback=None, interval=300, refresh_backoff=1800,
+                 timeout=10):
+        self.accounts = accounts
+        self.base_url = base_url
+        self.refresh = refresh
+        self.fallback = fallback
+        self.interval = interval
+        self.refresh_backoff = refresh_backoff
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._status = {}
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._loop, name='session-health', daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while True:
+            for account in self.accounts.all():
+                try:
+                    self.check(account)
+                except Exception as e:
+                    logger.error(f"Session check for account {account.name} failed: {str(e)}")
+            time.sleep(self.interval)
+
+    def check(self, account):
+        """Probe one account's session and refresh it if it is dead; returns the probe result"""
+        store = account.session_store
+        cookies = store.get_cookies()
+        if not cookies and self.fallback:
+            cookies = self.fallback(account)
+        # Cookie expiry dates are only a hint; the server's answer decides
+        result = probe_session(self.base_url, cookies, timeout=self.timeout) if cookies else EXPIRED
+        SESSION_CHECKS.inc(account=account.name, result=result)
+
+        if result == VALID:
+            store.mark_verified()
+        elif result == EXPIRED:
+            if cookies:
+                logger.warning(f"Session for account {account.name} has expired")
+            store.mark_invalid()
+        self._update(account.name, last_checked=time.time(), last_result=result)
+
+        if result == EXPIRED and self.refresh:
+            self._try_refresh(account)
+        return result
+
+    def _try_refresh(self, account):
+        status = self.status(account.name)
+        last_failed = status.get('last_refresh_failed_at')
+        if last_failed and time.time() - last_failed < self.refresh_backoff:
+            return
+        logger.info(f"Refreshing session for account {account.name}")
+        try:
+            refreshed = self.refresh(account)
+        except Exception as e:
+            logger.error(f"Session refresh for account {account.name} raised: {str(e)}")
+            refreshed = False
+        if refreshed is None:
+            # No credentials configured for this account
+            return
+        SESSION_REFRESHES.inc(account=account.name, result='succeeded' if refreshed else 'failed')
+        if refreshed:
+            self._update(account.name, last_refreshed_at=time.time(), last_refresh_failed_at=None)
+            logger.info(f"Session for account {account.name} refreshed")
+        else:
+            self._update(account.name, last_refresh_failed_at=time.time())
+
+    def _update(self, name, **fields):
+        with self._lock:
+            self._status.setdefault(name, {}).update(fields)
+
+    def status(self, name):
+        with self._lock:
+            return dict(self._status.get(name, {}))
@@ -0,0 +1,123 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_cookie(cookie, default_domain='.wellfound.com'):
+    """Keep only the fields Selenium's add_cookie accepts"""
+    clean = {
+        'name': cookie.get('name'),
+        'value': cookie.get('value'),
+        'domain': cookie.get('domain') or default_domain,
+        'path': cookie.get('path', '/'),
+    }
+    for field in ('expiry', 'secure', 'httpOnly', 'sameSite'):
+        if field in cookie:
+            clean[field] = cookie[field]
+    return clean
+
+
+def write_json_atomic(path, data):
+    """Write JSON to a temp file and rename it over ``path`` so readers never see a partial file"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class SessionStore:
+    """In-memory cookie jar for one Wellfound identity, persisted to ``path``.
+
+    Tracks when the cookies expire and when they were last verified against
+    a logged-in page, so drivers can skip the /inbox check while a session
+    is known to be good. ``generation`` changes whenever the cookies are
+    replaced, which lets pooled drivers notice and re-apply them.
+    """
+
+    def __init__(self, path='browser_cookies.json', verify_ttl=600):
+        self.path = path
+        self.verify_ttl = verify_ttl
+        self._lock = threading.Lock()
+        self._cookies = []
+        self.generation = 0
+        self.last_verified = None
+        self.valid = None
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    self._cookies = [normalize_cookie(c) for c in json.load(f) if c.get('name')]
+                logger.info(f"Loaded {len(self._cookies)} cookies from {path}")
+            except Exception as e:
+                logger.error(f"Error loading cookies from {path}: {str(e)}")
+
+    def get_cookies(self):
+        with self._lock:
+            return [dict(c) for c in self._cookies]
+
+    def set_cookies(self, cookies):
+        cookies = [normalize_cookie(c) for c in cookies if c.get('name')]
+        with self._lock:
+            self._cookies = cookies
+            self.generation += 1
+            self.last_verified = None
+            self.valid = None
+            if self.path:
+                write_json_atomic(self.path, cookies)
+        logger.info(f"Stored {len(cookies)} cookies (generation {self.generation})")
+
+    @property
+    def expires_at(self):
+        """Latest expiry among cookies that have one, or None for session cookies.
+
+        Short-lived cookies (bot-check, analytics) come and go without ending
+        the login, so only the longest-lived one bounds the session.
+        """
+        with self._lock:
+            expiries = [c['expiry'] for c in self._cookies if c.get('expiry')]
+        return max(expiries) if expiries else None
+
+    def is_expired(self):
+        """True once every persistent cookie has expired; a hint to re-check, not proof of logout"""
+        expires_at = self.expires_at
+        return expires_at is not None and expires_at <= time.time()
+
+    def mark_verified(self):
+        with self._lock:
+            self.last_verified = time.time()
+            self.valid = True
+
+    def mark_invalid(self):
+        with self._lock:
+            self.last_verified = None
+            self.valid = False
+
+    def recently_verified(self):
+        with self._lock:
+            if not self.valid or self.last_verified is None:
+                return False
+            fresh = time.time() - self.last_verified < self.verify_ttl
+        return fresh and not self.is_expired()
+
+    def status(self):
+        with self._lock:
+            count = len(self._cookies)
+            last_verified = self.last_verified
+            valid = self.valid
+        return {
+            'cookies': count,
+            'generation': self.generation,
+            'valid': valid,
+            'last_verified': last_verified,
+            'expires_at': self.expires_at,
+        }
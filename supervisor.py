@@ -0,0 +1,301 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import psutil
+
+from browser_cache import CACHE_DIR
+from metrics import Counter, Gauge
+from session_store import write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+DRIVERS_REAPED = Counter('wellfound_drivers_reaped_total', 'Browser process trees killed by the supervisor',
+                         labelnames=('reason',))
+
+# Every Chrome we start uses a profile dir with this prefix (see ProfileTemplate.checkout)
+PROFILE_MARKER = 'wellfound-profile-'
+
+
+def process_tree(pid, create_time=None):
+    """``pid`` and all its descendants, or [] if it exited or the pid was reused"""
+    try:
+        root = psutil.Process(pid)
+        if create_time is not None and abs(root.create_time() - create_time) > 1:
+            return []
+        return [root] + root.children(recursive=True)
+    except psutil.Error:
+        return []
+
+
+def tree_rss(processes):
+    total = 0
+    for proc in processes:
+        try:
+            total += proc.memory_info().rss
+        except psutil.Error:
+            pass
+    return total
+
+
+def kill_tree(processes, timeout=5):
+    """Kill a process tree, children first, and reap any that are our own children"""
+    for proc in reversed(processes):
+        try:
+            proc.kill()
+        except psutil.Error:
+            pass
+    psutil.wait_procs(processes, timeout=timeout)
+
+
+def profile_dir_of(proc):
+    try:
+        for arg in proc.cmdline():
+            if arg.startswith('--user-data-dir=') and PROFILE_MARKER in arg:
+                return arg.split('=', 1)[1]
+    except psutil.Error:
+        pass
+    return None
+
+
+class SupervisedDriver:
+    def __init__(self, automation, pid):
+        self.automation = automation
+        self.pid = pid
+        self.create_time = psutil.Process(pid).create_time()
+        self.profile_dir = automation.profile_dir
+        self.registered_at = time.monotonic()
+        self.closing_since = None
+        self.rss = 0
+        self.processes = 0
+
+    def to_record(self):
+        return {'pid': self.pid, 'create_time': self.create_time, 'profile_dir': self.profile_dir}
+
+
+class DriverSupervisor:
+    """Tracks every chromedriver/Chrome tree this process starts and keeps them in bounds.
+
+    On a timer it measures each tree's RSS and age. Drivers over ``max_rss``
+    bytes or ``max_lifetime`` seconds get ``recycle_reason`` set, and the
+    driver pool replaces them at their next checkout or release. A driver
+    still alive ``hard_kill_after`` seconds past its lifetime, or stuck in
+    ``close()`` for ``quit_grace`` seconds, is killed outright.
+
+    Each process also records its drivers in ``<registry_dir>/<pid>.json``.
+    ``reap_orphans`` uses those records, plus the profile-dir marker on
+    Chrome's command line, to kill trees left behind by a process that died
+    without reaching ``close()``.
+    """
+
+    def __init__(self, registry_dir, max_rss=1024 * 1024 * 1024, max_lifetime=7200, interval=15,
+                 quit_grace=30, hard_kill_after=600, orphan_grace=120, reap_interval=300):
+        self.registry_dir = registry_dir
+        self.max_rss = max_rss
+        self.max_lifetime = max_lifetime
+        self.interval = interval
+        self.quit_grace = quit_grace
+        self.hard_kill_after = hard_kill_after
+        self.orphan_grace = orphan_grace
+        self.reap_interval = reap_interval
+        self._lock = threading.Lock()
+        self._drivers = {}
+        self._thread = None
+        self._me = psutil.Process(os.getpid())
+
+    @property
+    def registry_file(self):
+        return os.path.join(self.registry_dir, f'{os.getpid()}.json')
+
+    def start(self):
+        """Reap what earlier processes left behind, then start the periodic check"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._loop, name='driver-supervisor', daemon=True)
+        os.makedirs(self.registry_dir, exist_ok=True)
+        self.reap_orphans()
+        self._thread.start()
+
+    def register(self, automation):
+        try:
+            driver = SupervisedDriver(automation, automation.driver.service.process.pid)
+        except Exception as e:
+            logger.warning(f"Could not supervise driver: {str(e)}")
+            return
+        # Claim the driver before the first orphan sweep so it isn't mistaken for one
+        with self._lock:
+            self._drivers[id(automation)] = driver
+        self.start()
+        self._save()
+
+    def closing(self, automation):
+        """Note that ``close()`` started; if the tree outlives quit_grace it gets killed"""
+        with self._lock:
+            driver = self._drivers.get(id(automation))
+            if driver:
+                driver.closing_since = time.monotonic()
+
+    def unregister(self, automation):
+        with self._lock:
+            driver = self._drivers.pop(id(automation), None)
+        if driver:
+            self._save()
+
+    def _save(self):
+        with self._lock:
+            records = [d.to_record() for d in self._drivers.values()]
+        try:
+            write_json_atomic(self.registry_file, {'create_time': self._me.create_time(), 'drivers': records})
+        except Exception as e:
+            logger.warning(f"Could not write driver registry: {str(e)}")
+
+    def _loop(self):
+        last_reap = time.monotonic()
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.check()
+                if time.monotonic() - last_reap >= self.reap_interval:
+                    last_reap = time.monotonic()
+                    self.reap_orphans()
+            except Exception as e:
+                logger.error(f"Driver supervisor check failed: {str(e)}")
+
+    def check(self):
+        """Measure every driver, flag the ones over their caps and kill hung ones"""
+        now = time.monotonic()
+        with self._lock:
+            drivers = list(self._drivers.values())
+        for driver in drivers:
+            processes = process_tree(driver.pid, driver.create_time)
+            driver.processes = len(processes)
+            driver.rss = tree_rss(processes)
+            age = now - driver.registered_at
+
+            if driver.closing_since is not None:
+                if now - driver.closing_since > self.quit_grace:
+                    logger.warning(f"Driver {driver.pid} hung while closing, killing it")
+                    self._kill(driver, processes, 'hung_quit')
+                continue
+            if not processes:
+                driver.automation.recycle_reason = 'chromedriver exited'
+                continue
+            if self.max_lifetime and age > self.max_lifetime + self.hard_kill_after:
+                logger.warning(f"Driver {driver.pid} outlived its lifetime by {self.hard_kill_after}s, killing it")
+                self._kill(driver, processes, 'stuck')
+            elif self.max_rss and driver.rss > self.max_rss:
+                driver.automation.recycle_reason = f'RSS {driver.rss // (1024 * 1024)}MB over cap'
+            elif self.max_lifetime and age > self.max_lifetime:
+                driver.automation.recycle_reason = 'lifetime cap reached'
+
+    def _kill(self, driver, processes, reason):
+        kill_tree(processes)
+        DRIVERS_REAPED.inc(reason=reason)
+        driver.automation.recycle_reason = reason
+        self.unregister(driver.automation)
+
+    def _live_profile_dirs(self):
+        """Profile dirs claimed by live processes' registries; removes registries of dead ones"""
+        claimed = set()
+        for name in os.listdir(self.registry_dir):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.registry_dir, name)
+            try:
+                with open(path, 'r') as f:
+                    registry = json.load(f)
+                owner = int(name[:-len('.json')])
+            except (OSError, ValueError):
+                continue
+            if process_tree(owner, registry.get('create_time')):
+                claimed.update(d['profile_dir'] for d in registry.get('drivers', []) if d.get('profile_dir'))
+                continue
+            # The owner is gone: whatever it registered is orphaned
+            for record in registry.get('drivers', []):
+                processes = process_tree(record['pid'], record.get('create_time'))
+                if processes:
+                    logger.warning(f"Killing chromedriver {record['pid']} left by dead process {owner}")
+                    kill_tree(processes)
+                    DRIVERS_REAPED.inc(reason='orphan')
+                if record.get('profile_dir'):
+                    shutil.rmtree(record['profile_dir'], ignore_errors=True)
+            os.remove(path)
+        return claimed
+
+    def reap_orphans(self):
+        """Kill leftover browsers: those recorded by dead processes, plus orphaned Chrome trees.
+
+        The host-wide sweep only touches a Chrome whose chromedriver is gone
+        (it was reparented to init or a subreaper) and whose profile dir sits
+        in this machine's temp root. A browser still under its chromedriver
+        may belong to another instance or user, so only registry records can
+        condemn it.
+        """
+        claimed = self._live_profile_dirs()
+        with self._lock:
+            claimed.update(d.profile_dir for d in self._drivers.values() if d.profile_dir)
+        temp_root = os.path.realpath(tempfile.gettempdir())
+        now = time.time()
+        reaped = 0
+        for proc in psutil.process_iter(['name', 'create_time']):
+            profile_dir = profile_dir_of(proc)
+            if not profile_dir or profile_dir in claimed:
+                continue
+            if os.path.dirname(os.path.realpath(profile_dir)) != temp_root:
+                continue
+            # A driver starting in another process may not have registered yet
+            if now - (proc.info['create_time'] or now) < self.orphan_grace:
+                continue
+            try:
+                parent = proc.parent()
+                # Only act on the top of the tree, the main Chrome process
+                if parent and profile_dir_of(parent) == profile_dir:
+                    continue
+                if parent and parent.pid != 1 and 'chromedriver' in (parent.name() or ''):
+                    continue
+                tree = [proc] + proc.children(recursive=True)
+            except psutil.Error:
+                continue
+            logger.warning(f"Killing orphaned browser {proc.pid} using {profile_dir}")
+            kill_tree(tree)
+            shutil.rmtree(profile_dir, ignore_errors=True)
+            DRIVERS_REAPED.inc(reason='orphan')
+            claimed.add(profile_dir)
+            reaped += 1
+        return reaped
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            drivers = list(self._drivers.values())
+        return [{
+            'account': getattr(d.automation, 'account', None),
+            'chromedriver_pid': d.pid,
+            'processes': d.processes,
+            'rss_mb': round(d.rss / 1024 / 1024, 1),
+            'age_s': round(now - d.registered_at),
+            'closing': d.closing_since is not None,
+            'recycle_reason': getattr(d.automation, 'recycle_reason', None),
+        } for d in drivers]
+
+    def total(self, field):
+        with self._lock:
+            return sum(getattr(d, field) for d in self._drivers.values())
+
+
+SUPERVISOR = DriverSupervisor(
+    os.path.join(CACHE_DIR, 'drivers'),
+    max_rss=int(os.getenv('DRIVER_MAX_RSS_MB', '1024')) * 1024 * 1024,
+    max_lifetime=int(os.getenv('DRIVER_MAX_LIFETIME_MINUTES', '120')) * 60,
+    interval=int(os.getenv('DRIVER_SUPERVISOR_INTERVAL', '15'))
+)
+
+Gauge('wellfound_driver_processes', 'Chrome and chromedriver processes owned by this server',
+      lambda: SUPERVISOR.total('processes'))
+Gauge('wellfound_driver_rss_bytes', 'Resident memory of all browser process trees',
+      lambda: SUPERVISOR.total('rss'))
@@ -0,0 +1,186 @@
+import logging
+import time
+
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.common.keys import Keys
+
+logger = logging.getLogger(__name__)
+
+# Set on the old document before navigating; a fresh document won't have it
+NAVIGATE_SCRIPT = """
+window.__wfLeaving = true;
+window.location.href = arguments[0];
+"""
+
+NEW_DOCUMENT_READY_SCRIPT = """
+return !window.__wfLeaving && location.href !== 'about:blank' && document.readyState !== 'loading';
+"""
+
+
+class TabTask:
+    """One message being driven through its flow in its own tab"""
+
+    def __init__(self, index, message_url, message, flow, timeout):
+        self.index = index
+        self.message_url = message_url
+        self.message = message
+        self.flow = flow
+        self.timeout = timeout
+        self.handle = None
+        self.stage = 'navigate'
+        self.step = 0
+        self.input_element = None
+        self.confirmation = None
+        self.failed_request = None
+        self.started = time.monotonic()
+        self.deadline = self.started + timeout
+        self.error = None
+
+    def advance_to(self, stage):
+        self.stage = stage
+        self.deadline = time.monotonic() + self.timeout
+
+    def result(self):
+        return {
+            'index': self.index,
+            'message_url': self.message_url,
+            'success': self.error is None,
+            'error': self.error,
+            'elapsed_ms': round((time.monotonic() - self.started) * 1000),
+            'confirmation': self.confirmation
+        }
+
+
+class TabRunner:
+    """Drive several sends at once in separate tabs of one browser.
+
+    WebDriver executes one command at a time per session, so tabs are
+    advanced cooperatively: each pass switches to a tab, runs one
+    non-blocking check or action, and moves on. While one tab is loading or
+    waiting for its composer, the others make progress.
+
+    A flow is a list of ``(action, LocatorGroup)`` steps where action is
+    ``click``, ``type`` or ``click_or_enter``.
+    """
+
+    def __init__(self, automation, tabs, step_timeout=15):
+        self.automation = automation
+        self.driver = automation.driver
+        self.tabs = tabs
+        self.step_timeout = step_timeout
+
+    def run(self, items):
+        """Send (message_url, message, flow) items, yielding results as they finish.
+
+        ``items`` may yield None to say nothing is ready yet (e.g. the next
+        recipient is rate limited); the runner keeps advancing the open tabs
+        and asks again on the next pass.
+        """
+        items = iter(items)
+        original = self.driver.current_window_handle
+        handles = [original]
+        for _ in range(self.tabs - 1):
+            self.driver.switch_to.new_window('tab')
+            self.automation.configure_tab()
+            handles.append(self.driver.current_window_handle)
+        free = list(handles)
+        active = []
+        next_index = 0
+        exhausted = False
+
+        try:
+            while active or not exhausted:
+                while free and not exhausted:
+                    try:
+                        item = next(items)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    if item is None:
+                        break
+                    message_url, message, flow = item
+                    task = TabTask(next_index, message_url, message, flow, self.step_timeout)
+                    task.handle = free.pop()
+                    next_index += 1
+                    active.append(task)
+
+                progressed = False
+                for task in list(active):
+                    try:
+                        self.driver.switch_to.window(task.handle)
+                        progressed = self._advance(task) or progressed
+                    except Exception as e:
+                        task.error = str(e)
+                    if task.error is None and task.stage != 'done' and time.monotonic() > task.deadline:
+                        task.error = task.failed_request or f"Timed out at stage {task.stage}"
+                    if task.error is not None or task.stage == 'done':
+                        if task.error:
+                            logger.error(f"Tab send to {task.message_url} failed: {task.error}")
+                            self.automation.capture_failure(f"Tab send to {task.message_url} failed: {task.error}")
+                        active.remove(task)
+                        free.append(task.handle)
+                        yield task.result()
+
+                if not progressed:
+                    time.sleep(0.05)
+        finally:
+            for handle in handles[1:]:
+                try:
+                    self.driver.switch_to.window(handle)
+                    self.driver.close()
+                except Exception as e:
+                    logger.warning(f"Error closing tab: {str(e)}")
+            self.driver.switch_to.window(original)
+
+    def _advance(self, task):
+        """Run one non-blocking step for ``task``; return True if it moved forward"""
+        if task.stage == 'navigate':
+            self.driver.execute_script(NAVIGATE_SCRIPT, task.message_url)
+            task.advance_to('loading')
+            return True
+
+        if task.stage == 'loading':
+            try:
+                ready = self.driver.execute_script(NEW_DOCUMENT_READY_SCRIPT)
+            except WebDriverException:
+                # The old document can be torn down mid-call while navigating
+                return False
+            if not ready:
+                return False
+            task.advance_to('steps')
+            return True
+
+        if task.stage == 'steps':
+            action, group = task.flow[task.step]
+            _, element = group.probe(self.driver, clickable=action != 'type')
+            last_step = task.step == len(task.flow) - 1
+            if element is None:
+                if action == 'click_or_enter' and time.monotonic() > task.deadline - self.step_timeout / 2:
+                    # Button never showed up; fall back to pressing Enter in the composer
+                    self.automation.watch_for_confirmation(task.input_element, task.message)
+                    task.input_element.send_keys(Keys.RETURN)
+                else:
+                    return False
+            elif action == 'type':
+                self.automation.type_message(element, task.message)
+                task.input_element = element
+            else:
+                if last_step:
+                    self.automation.watch_for_confirmation(task.input_element, task.message)
+                element.click()
+            task.step += 1
+            task.advance_to('confirming' if task.step == len(task.flow) else 'steps')
+            return True
+
+        if task.stage == 'confirming':
+            state = self.automation.confirmation_state()
+            if state.get('error'):
+                raise Exception(state['error'])
+            if not state.get('confirmed'):
+                task.failed_request = state.get('failed')
+                return False
+            task.confirmation = {'via': state['confirmed'], 'confirm_ms': round(state['elapsed_ms'])}
+            task.advance_to('done')
+            return True
+
+        return False
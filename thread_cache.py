@@ -0,0 +1,76 @@
+import logging
+import sqlite3
+import threading
+import time
+
+from metrics import Counter
+from rate_limiter import recipient_key
+
+logger = logging.getLogger(__name__)
+
+THREAD_CACHE_LOOKUPS = Counter('wellfound_thread_cache_lookups_total', 'Recipient to conversation lookups',
+                               labelnames=('result',))
+
+
+class ThreadCache:
+    """Persistent map from (account, recipient profile URL) to the conversation it opened.
+
+    Lets a repeat send skip the profile page and go straight to the thread.
+    Entries expire after ``ttl`` seconds and are dropped as soon as a cached
+    thread stops working. Stored in SQLite so every worker process shares it.
+    """
+
+    def __init__(self, path='thread_cache.db', ttl=7 * 86400):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path or ':memory:', check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS threads (
+                account TEXT NOT NULL,
+                recipient TEXT NOT NULL,
+                thread_url TEXT NOT NULL,
+                resolved_at REAL NOT NULL,
+                PRIMARY KEY (account, recipient)
+            )
+        ''')
+        self.prune()
+
+    def get(self, account, profile_url):
+        """Cached thread URL for this account and recipient, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT thread_url, resolved_at FROM threads WHERE account = ? AND recipient = ?',
+                (account, recipient_key(profile_url))
+            ).fetchone()
+        if row is None:
+            THREAD_CACHE_LOOKUPS.inc(result='miss')
+            return None
+        if time.time() - row[1] > self.ttl:
+            THREAD_CACHE_LOOKUPS.inc(result='expired')
+            self.invalidate(account, profile_url)
+            return None
+        THREAD_CACHE_LOOKUPS.inc(result='hit')
+        return row[0]
+
+    def put(self, account, profile_url, thread_url):
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO threads (account, recipient, thread_url, resolved_at) VALUES (?, ?, ?, ?)',
+                (account, recipient_key(profile_url), thread_url, time.time())
+            )
+        logger.info(f"Cached conversation {thread_url} for {profile_url}")
+
+    def invalidate(self, account, profile_url):
+        with self._lock:
+            self._conn.execute(
+                'DELETE FROM threads WHERE account = ? AND recipient = ?', (account, recipient_key(profile_url))
+            )
+
+    def prune(self):
+        """Delete expired entries"""
+        with self._lock:
+            return self._conn.execute(
+                'DELETE FROM threads WHERE resolved_at < ?', (time.time() - self.ttl,)
+            ).rowcount
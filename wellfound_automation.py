@@ -4,18 +4,245 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from selenium.webdriver.chrome.options import Options
-import chromedriver_autoinstaller
+from selenium.webdriver.chrome.service import Service
 import os
-import json
 import logging
+import shutil
 import time
-from urllib.parse import unquote
+from urllib.parse import unquote, urlparse
 from selenium.webdriver.common.keys import Keys
+from locators import LocatorGroup, SelectorStats
+from tabs import TabRunner
+from http_sender import HttpMessageSender, REJECTED, SENT
+from session_store import SessionStore, normalize_cookie
+from metrics import span, timed
+from browser_cache import PROFILE_TEMPLATE, resolve_chromedriver
+from diagnostics import DOM_SNAPSHOT_SCRIPT
+from supervisor import SUPERVISOR
+
+# Injected into every document so a send can be confirmed by the response to
+# the page's own fetch/XHR request
+NETWORK_TRACKER_SCRIPT = """
+(function() {
+    if (window.__wfNet) return;
+    // writes: outcome of every same-origin non-GET request to the messaging or
+    // GraphQL endpoints, so a send can be confirmed by its response. Analytics
+    // and other third-party posts are ignored.
+    var net = window.__wfNet = {writes: []};
+    var SEND_PATH = /graphql|messages/i;
+    function record(method, url, status) {
+        method = (method || 'GET').toUpperCase();
+        if (method === 'GET' || method === 'HEAD') return;
+        try {
+            var target = new URL(url, location.href);
+            if (target.origin !== location.origin || !SEND_PATH.test(target.pathname)) return;
+        } catch (e) {
+            return;
+        }
+        net.writes.push({ok: status >= 200 && status < 300, status: status, at: performance.now()});
+    }
+    var origFetch = window.fetch;
+    if (origFetch) {
+        window.fetch = function(input, init) {
+            var method = (init && init.method) || (input && input.method);
+            var url = input && input.url !== undefined ? input.url : String(input);
+            return origFetch.apply(this, arguments).then(
+                function(r) { record(method, url, r.status); return r; },
+                function(e) { record(method, url, 0); throw e; }
+            );
+        };
+    }
+    var origOpen = XMLHttpRequest.prototype.open;
+    XMLHttpRequest.prototype.open = function(method, url) {
+        this.__wfMethod = method;
+        this.__wfUrl = String(url);
+        return origOpen.apply(this, arguments);
+    };
+    var origSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function() {
+        var xhr = this;
+        xhr.addEventListener('loadend', function() { record(xhr.__wfMethod, xhr.__wfUrl, xhr.status); });
+        return origSend.apply(this, arguments);
+    };
+})();
+"""
+
+# Installed right before the send click: watches for a newly added node carrying
+# the message text (outside the composer), so an earlier identical message in
+# the thread can't confirm this one
+CONFIRM_WATCH_SCRIPT = """
+var composer = arguments[0];
+function norm(text) { return (text || '').replace(/\\s+/g, ' ').trim(); }
+var needle = norm(arguments[1]).slice(0, 80);
+var net = window.__wfNet;
+var state = window.__wfConfirm = {started: performance.now(), seen: null, writes: net ? net.writes.length : 0};
+if (window.__wfConfirmObserver) window.__wfConfirmObserver.disconnect();
+function matches(node) {
+    if (node.nodeType === 3) node = node.parentElement;
+    if (!node || node.nodeType !== 1) return false;
+    if (composer && (composer === node || composer.contains(node) || node.contains(composer))) return false;
+    return norm(node.textContent).indexOf(needle) !== -1;
+}
+var observer = window.__wfConfirmObserver = new MutationObserver(function(mutations) {
+    for (var i = 0; i < mutations.length; i++) {
+        var m = mutations[i];
+        var nodes = m.type === 'characterData' ? [m.target] : m.addedNodes;
+        for (var j = 0; j < nodes.length; j++) {
+            if (matches(nodes[j])) {
+                state.seen = performance.now() - state.started;
+                observer.disconnect();
+                return;
+            }
+        }
+    }
+});
+observer.observe(document.body, {childList: true, subtree: true, characterData: true});
+"""
+
+# Non-blocking read of the watcher: the bubble showing up or a messaging write
+# after the click succeeding confirms the send. A failed write only explains a
+# timeout (``failed``); the bubble may still appear after a client retry.
+CONFIRM_STATE_SCRIPT = """
+var state = window.__wfConfirm;
+if (!state) return {pending: false, error: 'Confirmation watcher was lost (page navigated away)'};
+if (state.seen !== null) return {confirmed: 'dom', elapsed_ms: state.seen};
+var net = window.__wfNet;
+var writes = net ? net.writes.slice(state.writes) : [];
+var failed = null;
+for (var i = 0; i < writes.length; i++) {
+    if (writes[i].ok) return {confirmed: 'response', elapsed_ms: writes[i].at - state.started};
+    failed = 'Send request failed with status ' + writes[i].status;
+}
+return {pending: true, failed: failed, elapsed_ms: performance.now() - state.started};
+"""
+
+# Failure screenshots are half-size, low-quality JPEGs with the first 20k characters of DOM
+DIAGNOSTICS_SCALE = 0.5
+DIAGNOSTICS_JPEG_QUALITY = 40
+DIAGNOSTICS_DOM_CHARS = 20000
+
+# Learns which selector currently matches so it is tried first
+SELECTOR_STATS = SelectorStats(os.getenv('SELECTOR_STATS_FILE', 'selector_stats.json'))
+
+# Requests blocked in lean mode: heavy assets and third-party trackers that the
+# messaging DOM doesn't need. Patterns use CDP Network.setBlockedURLs wildcards.
+DEFAULT_BLOCKED_URLS = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.avif', '*.svg', '*.ico',
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+    '*.mp4', '*.webm', '*.mp3', '*.m3u8',
+    '*googletagmanager.com*', '*google-analytics.com*', '*doubleclick.net*',
+    '*cookielaw.org*', '*onetrust.com*', '*segment.com*', '*segment.io*',
+    '*hotjar.com*', '*facebook.net*', '*intercom.io*', '*fullstory.com*',
+]
+
+# Fallback selectors for each element, raced together in one wait
+MESSAGE_BUTTON = LocatorGroup('message_button', [
+    "[data-test='message-button']",
+    ".message-button",
+    "//button[contains(., 'Message')]"
+], stats=SELECTOR_STATS)
+MESSAGE_INPUT = LocatorGroup('message_input', [
+    "[data-test='messaging-composer'] textarea",
+    ".message-input",
+    "textarea[placeholder*='message']",
+    "//textarea[contains(@placeholder, 'message')]"
+], stats=SELECTOR_STATS)
+SEND_BUTTON = LocatorGroup('send_button', [
+    "[data-test='send-message-button']",
+    ".send-button",
+    "//button[contains(., 'Send')]"
+], stats=SELECTOR_STATS)
+COMPANY_MESSAGE_INPUT = LocatorGroup('company_message_input', [
+    "[data-test='messaging-composer'] textarea",
+    "textarea[placeholder*='Type a message']",
+    "textarea.message-input",
+    "//textarea[contains(@placeholder, 'Type')]"
+], stats=SELECTOR_STATS)
+COMPANY_SEND_BUTTON = LocatorGroup('company_send_button', [
+    "[data-test='send-message']",
+    "button[type='submit']",
+    ".send-button",
+    "//button[contains(., 'Send')]"
+], stats=SELECTOR_STATS)
+
+# Used by setup_with_specific_cookies when the session store has no cookies yet
+DEFAULT_COOKIES = [
+    {
+        'name': 'CF_VERIFIED_DEVICE_ea160c806c7098c731795de2b4d94509e3227fbd1751c6c160a6b11fdfd7bfb7',
+        'value': '1733516879',
+        'domain': 'wellfound.com',
+        'path': '/',
+        'secure': True,
+        'httpOnly': True
+    },
+    {
+        'name': 'OptanonConsent',
+        'value': 'isGpcEnabled=0&datestamp=Sat+Dec+07+2024+01%3A59%3A37+GMT%2B0530+(India+Standard+Time)&version=202407.2.0&browserGpcFlag=0&isIABGlobal=false&hosts=&consentId=b3e7953a-a59a-47f4-8239-80e107f4d4fe&interactionCount=0&isAnonUser=1&landingPath=https%3A%2F%2Fdevelopers.cloudflare.com%2Fpages%2Fconfiguration%2Fbranch-build-controls%2F&groups=C0001%3A1%2CC0003%3A1%2CC0002%3A1%2CC0004%3A1',
+        'domain': 'wellfound.com',
+        'path': '/',
+        'secure': True
+    }
+]
+
+# Steps used when several messages are driven in parallel tabs
+PROFILE_FLOW = [('click', MESSAGE_BUTTON), ('type', MESSAGE_INPUT), ('click', SEND_BUTTON)]
+COMPANY_FLOW = [('type', COMPANY_MESSAGE_INPUT), ('click_or_enter', COMPANY_SEND_BUTTON)]
+
+# Sets a React-controlled field's value in one call: use the native setter so
+# React's value tracker sees a change, then fire the events it listens for
+SET_INPUT_VALUE_SCRIPT = """
+var el = arguments[0], value = arguments[1];
+el.focus();
+if (el.isContentEditable) {
+    document.execCommand('selectAll', false, null);
+    document.execCommand('insertText', false, value);
+    return el.innerText;
+}
+var proto = el.tagName === 'TEXTAREA' ? HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+Object.getOwnPropertyDescriptor(proto, 'value').set.call(el, value);
+el.dispatchEvent(new Event('input', {bubbles: true}));
+el.dispatchEvent(new Event('change', {bubbles: true}));
+return el.value;
+"""
+
+INPUT_VALUE_SCRIPT = """
+var el = arguments[0];
+return el.isContentEditable ? el.innerText : el.value;
+"""
 
 class WellfoundAutomation:
-    def __init__(self, headless=True):
+    def __init__(self, headless=True, tabs=1, fast_path=False, session_store=None,
+                 lean=False, page_load_strategy='normal', blocked_urls=None, input_mode='js',
+                 base_url=None, account='default', thread_cache=None, diagnostics=None):
+        # Wellfound identity this browser sends as; each account has its own cookie jar and pool
+        self.account = account
+        # Site root; override (or set WELLFOUND_BASE_URL) to run against a mock server
+        self.base_url = (base_url or os.getenv('WELLFOUND_BASE_URL', 'https://wellfound.com')).rstrip('/')
+        # Shared cookie jar; pooled drivers pass the app-wide store
+        self.session_store = session_store or SessionStore('cookies.json')
+        self.cookie_generation = None
+        # How message text is entered: 'js' (one execute_script), 'cdp' (Input.insertText) or 'keys'
+        self.input_mode = input_mode
+        # Number of tabs send_many drives concurrently in this one browser
+        self.tabs = max(1, tabs)
+        # Optional direct HTTP send for company threads, with the browser as fallback
+        self.http_sender = HttpMessageSender(os.getenv('WELLFOUND_API_BASE', self.base_url)) if fast_path else None
+        self.profile_dir = None
+        # Set by the supervisor when this driver went over its memory or lifetime cap
+        self.recycle_reason = None
+        # Optional ThreadCache so repeat profile sends go straight to the conversation
+        self.thread_cache = thread_cache
+        # Optional DiagnosticsStore for failure screenshots, filed under diagnostics_key (e.g. the job id)
+        self.diagnostics = diagnostics
+        self.diagnostics_key = None
+        # Set once the current send has been handed to Wellfound; a retry past this point could double-send
+        self.submitted = False
+        # How the last send was confirmed: {'via': 'dom'|'response'|'http', 'confirm_ms': ...}
+        self.last_confirmation = None
+        # Optional callable told about progress of the current send (set per job by the caller)
+        self.on_stage = None
         self.setup_logging()
-        self.setup_driver(headless)
+        self.setup_driver(headless, lean=lean, page_load_strategy=page_load_strategy, blocked_urls=blocked_urls)
 
     def setup_logging(self):
         logging.basicConfig(
@@ -24,13 +251,31 @@ class WellfoundAutomation:
         )
         self.logger = logging.getLogger(__name__)
 
-    def setup_driver(self, headless):
+    @timed('setup_driver')
+    def setup_driver(self, headless, lean=False, page_load_strategy='normal', blocked_urls=None):
+        """Create the Chrome driver.
+
+        ``lean`` blocks images, media, fonts and trackers (``blocked_urls``
+        defaults to DEFAULT_BLOCKED_URLS). ``page_load_strategy`` of
+        ``eager`` or ``none`` makes driver.get return before subresources load;
+        readiness waits and selector polling take over from there.
+        """
+        self.blocked_urls = (blocked_urls if blocked_urls is not None else DEFAULT_BLOCKED_URLS) if lean else []
+        # With eager/none loading an interactive document is ready enough
+        self.ready_states = ('complete',) if page_load_strategy == 'normal' else ('interactive', 'complete')
         try:
-            # Install ChromeDriver
-            chromedriver_autoinstaller.install()
+            # Resolve ChromeDriver once per process (and per Chrome version on disk)
+            with span('chromedriver_install'):
+                driver_path = resolve_chromedriver()
             
             # Set up Chrome options
             chrome_options = Options()
+            chrome_options.page_load_strategy = page_load_strategy
+            # Start from a pre-initialised profile copy instead of a blank one
+            self.profile_dir = PROFILE_TEMPLATE.checkout()
+            chrome_options.add_argument(f'--user-data-dir={self.profile_dir}')
+            chrome_options.add_argument('--no-first-run')
+            chrome_options.add_argument('--no-default-browser-check')
             if headless:
                 chrome_options.add_argument('--headless=new')
             chrome_options.add_argument('--no-sandbox')
@@ -42,42 +287,149 @@ class WellfoundAutomation:
             chrome_options.add_argument('--disable-blink-features=AutomationControlled')
             chrome_options.add_argument('--disable-web-security')
             chrome_options.add_argument('--ignore-certificate-errors')
+            # Keep background tabs running at full speed for multi-tab sends
+            chrome_options.add_argument('--disable-background-timer-throttling')
+            chrome_options.add_argument('--disable-backgrounding-occluded-windows')
+            chrome_options.add_argument('--disable-renderer-backgrounding')
             
             # Add additional preferences
             chrome_options.add_experimental_option('excludeSwitches', ['enable-automation'])
             chrome_options.add_experimental_option('useAutomationExtension', False)
-            chrome_options.add_experimental_option('prefs', {
+            prefs = {
                 'profile.default_content_setting_values.cookies': 1,
                 'profile.block_third_party_cookies': False,
                 'profile.cookie_controls_mode': 0
-            })
+            }
+            if lean:
+                # Don't even decode images that slip past the URL blocklist
+                prefs['profile.managed_default_content_settings.images'] = 2
+                chrome_options.add_argument('--blink-settings=imagesEnabled=false')
+                chrome_options.add_argument('--mute-audio')
+            chrome_options.add_experimental_option('prefs', prefs)
             
             # Create Chrome driver
-            self.driver = webdriver.Chrome(options=chrome_options)
+            self.driver = webdriver.Chrome(service=Service(executable_path=driver_path), options=chrome_options)
+            # Track the chromedriver/Chrome tree so it can't outlive this object
+            SUPERVISOR.register(self)
             
             # Set window size
             self.driver.set_window_size(1920, 1080)
             
-            # Set longer wait time for elements
-            self.wait = WebDriverWait(self.driver, 15)
+            # Set longer wait time for elements, polling often so waits return
+            # as soon as the element shows up
+            self.wait = WebDriverWait(self.driver, 15, poll_frequency=0.1)
             
-            # Execute CDP commands to modify navigator.webdriver flag
-            self.driver.execute_cdp_cmd('Network.enable', {})
-            self.driver.execute_cdp_cmd('Network.setExtraHTTPHeaders', {'headers': {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'}})
-            self.driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
-                "source": """
-                    Object.defineProperty(navigator, 'webdriver', {
-                        get: () => undefined
-                    })
-                """
-            })
+            self.configure_tab()
             
             self.logger.info("Chrome driver created successfully")
             
         except Exception as e:
             self.logger.error(f"Failed to create Chrome driver: {str(e)}")
+            if self.profile_dir:
+                shutil.rmtree(self.profile_dir, ignore_errors=True)
+                self.profile_dir = None
             raise
 
+    def configure_tab(self):
+        """Apply per-target CDP setup to the current tab (new tabs need it too)"""
+        # Execute CDP commands to modify navigator.webdriver flag
+        self.driver.execute_cdp_cmd('Network.enable', {})
+        self.driver.execute_cdp_cmd('Network.setExtraHTTPHeaders', {'headers': {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'}})
+        if self.blocked_urls:
+            self.driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': self.blocked_urls})
+        self.driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
+            "source": """
+                Object.defineProperty(navigator, 'webdriver', {
+                    get: () => undefined
+                })
+            """
+        })
+        self.driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
+            "source": NETWORK_TRACKER_SCRIPT
+        })
+
+    def cookie_for_site(self, cookie):
+        """Adapt a wellfound.com cookie to ``base_url`` (e.g. a local mock server)"""
+        host = urlparse(self.base_url).hostname or ''
+        domain = (cookie.get('domain') or '').lstrip('.')
+        if (domain and not host.endswith(domain)) or self.base_url.startswith('http://'):
+            cookie = dict(cookie)
+            if domain and not host.endswith(domain):
+                # Let the browser scope it to the current host
+                cookie.pop('domain', None)
+            if self.base_url.startswith('http://'):
+                cookie.pop('secure', None)
+        return cookie
+
+    def wait_for_page_ready(self, timeout=15, states=None):
+        """Wait until document.readyState reaches one of ``states``"""
+        states = states or self.ready_states
+        try:
+            # about:blank reports 'complete' before a non-blocking navigation commits
+            WebDriverWait(self.driver, timeout, poll_frequency=0.1).until(
+                lambda d: d.execute_script(
+                    "return location.href === 'about:blank' ? 'loading' : document.readyState"
+                ) in states
+            )
+            return True
+        except TimeoutException:
+            self.logger.warning(f"Page not ready after {timeout}s")
+            return False
+
+    def watch_for_confirmation(self, composer, message):
+        """Start watching the thread for ``message``; call right before sending it"""
+        self.driver.execute_script(CONFIRM_WATCH_SCRIPT, composer, message)
+
+    def confirmation_state(self):
+        """Non-blocking check of the watcher: {'confirmed': via, 'elapsed_ms': ...}, pending or error"""
+        return self.driver.execute_script(CONFIRM_STATE_SCRIPT) or {}
+
+    def wait_for_confirmation(self, timeout=10):
+        """Wait until the sent message shows up in the thread or its request succeeds.
+
+        Records the result in ``last_confirmation`` and raises if nothing was
+        seen within ``timeout`` seconds, naming the failed request if there was one.
+        """
+        with span('send_confirm'):
+            deadline = time.monotonic() + timeout
+            while True:
+                state = self.confirmation_state()
+                if state.get('confirmed'):
+                    self.last_confirmation = {'via': state['confirmed'], 'confirm_ms': round(state['elapsed_ms'])}
+                    self.notify_stage('confirmed', **self.last_confirmation)
+                    self.logger.info(
+                        f"Send confirmed via {state['confirmed']} after {state['elapsed_ms']:.0f}ms"
+                    )
+                    return self.last_confirmation
+                if state.get('error'):
+                    raise Exception(state['error'])
+                if time.monotonic() >= deadline:
+                    raise Exception(state.get('failed') or f"Message did not appear in the thread within {timeout}s")
+                time.sleep(0.1)
+
+    def type_message(self, element, message):
+        """Enter ``message`` into the composer, falling back to per-key typing.
+
+        The 'js' and 'cdp' modes set the whole text in one round trip and then
+        read the composer back to confirm the update took.
+        """
+        if self.input_mode in ('js', 'cdp'):
+            try:
+                if self.input_mode == 'cdp':
+                    element.clear()
+                    element.click()
+                    self.driver.execute_cdp_cmd('Input.insertText', {'text': message})
+                    value = self.driver.execute_script(INPUT_VALUE_SCRIPT, element)
+                else:
+                    value = self.driver.execute_script(SET_INPUT_VALUE_SCRIPT, element, message)
+                if (value or '').strip() == message.strip():
+                    return
+                self.logger.warning(f"Composer did not accept {self.input_mode} input, typing instead")
+            except Exception as e:
+                self.logger.warning(f"Fast input failed, typing instead: {str(e)}")
+        element.clear()
+        element.send_keys(message)
+
     def parse_cookie_string(self, cookie_string):
         try:
             # URL decode the cookie string
@@ -100,9 +452,8 @@ class WellfoundAutomation:
                     }
                     cookies.append(cookie)
             
-            # Save cookies to file
-            with open('cookies.json', 'w') as f:
-                json.dump(cookies, f)
+            # Save cookies to the session store
+            self.session_store.set_cookies(cookies)
             self.logger.info(f"Parsed and saved {len(cookies)} cookies")
             return True
             
@@ -121,36 +472,35 @@ class WellfoundAutomation:
 
     def load_cookies(self):
         try:
-            if not os.path.exists('cookies.json'):
-                self.logger.error("Cookie file not found")
+            cookies = self.session_store.get_cookies()
+            if not cookies:
+                self.logger.error("No stored cookies found")
                 return False
                 
-            # First navigate to the domain
-            self.driver.get('https://wellfound.com')
-            time.sleep(2)  # Wait for page to load
-            
-            # Load and add cookies
-            with open('cookies.json', 'r') as f:
-                cookies = json.load(f)
+            # First navigate to the domain (cookies only need the origin, not a loaded page)
+            self.driver.get(self.base_url)
+            self.wait_for_page_ready(states=('interactive', 'complete'))
             
+            # Add the stored cookies
             for cookie in cookies:
                 try:
-                    self.driver.add_cookie(cookie)
+                    self.driver.add_cookie(self.cookie_for_site(cookie))
                 except Exception as e:
                     self.logger.error(f"Error adding cookie {cookie['name']}: {str(e)}")
                     continue
             
             # Verify login status
-            self.driver.get('https://wellfound.com')
-            time.sleep(3)  # Wait for page to load
+            self.driver.get(self.base_url)
             
             # Check if we're logged in by looking for specific elements
             try:
                 self.wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "[data-test='user-menu']")))
                 self.logger.info("Successfully logged in with cookies")
+                self.session_store.mark_verified()
                 return True
             except TimeoutException:
                 self.logger.error("Failed to verify login status after adding cookies")
+                self.session_store.mark_invalid()
                 return False
                 
         except Exception as e:
@@ -160,17 +510,18 @@ class WellfoundAutomation:
     def save_cookies(self):
         try:
             cookies = self.driver.get_cookies()
-            with open('cookies.json', 'w') as f:
-                json.dump(cookies, f)
-            self.logger.info(f"Saved {len(cookies)} cookies to file")
+            self.session_store.set_cookies(cookies)
+            # This driver already holds these cookies, no need to re-apply them
+            self.cookie_generation = self.session_store.generation
+            self.logger.info(f"Saved {len(cookies)} cookies to the session store")
         except Exception as e:
             self.logger.error(f"Error saving cookies: {str(e)}")
 
+    @timed('login')
     def login(self, email, password):
         try:
             self.logger.info("Attempting to login")
-            self.driver.get('https://wellfound.com/login')
-            time.sleep(2)  # Wait for initial page load
+            self.driver.get(f'{self.base_url}/login')
             
             # Wait for email input and enter email
             email_input = self.wait.until(
@@ -185,7 +536,6 @@ class WellfoundAutomation:
             )
             continue_button.click()
             self.logger.info("Clicked continue")
-            time.sleep(2)  # Wait for password field
 
             # Wait for password input and enter password
             password_input = self.wait.until(
@@ -202,54 +552,44 @@ class WellfoundAutomation:
             self.logger.info("Clicked login")
 
             # Wait for login to complete and verify
-            time.sleep(5)
             try:
-                self.driver.find_element(By.CSS_SELECTOR, "[data-test='nav-profile-dropdown']")
+                self.wait.until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, "[data-test='nav-profile-dropdown']"))
+                )
                 self.logger.info("Login successful")
                 self.save_cookies()
+                self.session_store.mark_verified()
                 return True
-            except:
+            except TimeoutException:
                 self.logger.error("Could not verify login success")
+                self.capture_failure('login not confirmed', key=f'login-{self.account}')
                 return False
 
         except Exception as e:
             self.logger.error(f"Login failed: {str(e)}")
+            self.capture_failure(f'login failed: {str(e)}', key=f'login-{self.account}')
             return False
 
     def setup_with_browser_cookies(self, cookies):
         """Set up the browser with cookies from an active browser session"""
         try:
-            # First navigate to the domain
-            self.driver.get('https://wellfound.com')
-            time.sleep(2)  # Wait for page to load
+            # First navigate to the domain (cookies only need the origin, not a loaded page)
+            self.driver.get(self.base_url)
+            self.wait_for_page_ready(states=('interactive', 'complete'))
             
             # Add each cookie to the browser
             for cookie in cookies:
                 try:
                     # Clean the cookie data to only include required fields
-                    clean_cookie = {
-                        'name': cookie.get('name'),
-                        'value': cookie.get('value'),
-                        'domain': cookie.get('domain', '.wellfound.com'),
-                        'path': cookie.get('path', '/'),
-                    }
-                    # Only add optional fields if they exist
-                    if 'expiry' in cookie:
-                        clean_cookie['expiry'] = cookie['expiry']
-                    if 'secure' in cookie:
-                        clean_cookie['secure'] = cookie['secure']
-                    if 'httpOnly' in cookie:
-                        clean_cookie['httpOnly'] = cookie['httpOnly']
-                        
-                    self.driver.add_cookie(clean_cookie)
+                    clean_cookie = normalize_cookie(cookie)
+                    self.driver.add_cookie(self.cookie_for_site(clean_cookie))
                     self.logger.info(f"Added cookie: {clean_cookie['name']}")
                 except Exception as e:
                     self.logger.error(f"Error adding cookie {cookie.get('name')}: {str(e)}")
                     continue
             
             # Verify login status
-            self.driver.get('https://wellfound.com')
-            time.sleep(3)  # Wait for page to load
+            self.driver.get(self.base_url)
             
             # Check if we're logged in
             try:
@@ -264,31 +604,23 @@ class WellfoundAutomation:
             self.logger.error(f"Error setting up browser cookies: {str(e)}")
             return False
 
+    @timed('setup_with_specific_cookies')
     def setup_with_specific_cookies(self):
         """Set up the browser with specific Wellfound cookies"""
         try:
             # First navigate to the domain to ensure cookies can be set
-            self.driver.get('https://wellfound.com')
-            time.sleep(2)  # Wait for page load
-            
-            # Define the specific cookies
-            cookies = [
-                {
-                    'name': 'CF_VERIFIED_DEVICE_ea160c806c7098c731795de2b4d94509e3227fbd1751c6c160a6b11fdfd7bfb7',
-                    'value': '1733516879',
-                    'domain': 'wellfound.com',
-                    'path': '/',
-                    'secure': True,
-                    'httpOnly': True
-                },
-                {
-                    'name': 'OptanonConsent',
-                    'value': 'isGpcEnabled=0&datestamp=Sat+Dec+07+2024+01%3A59%3A37+GMT%2B0530+(India+Standard+Time)&version=202407.2.0&browserGpcFlag=0&isIABGlobal=false&hosts=&consentId=b3e7953a-a59a-47f4-8239-80e107f4d4fe&interactionCount=0&isAnonUser=1&landingPath=https%3A%2F%2Fdevelopers.cloudflare.com%2Fpages%2Fconfiguration%2Fbranch-build-controls%2F&groups=C0001%3A1%2CC0003%3A1%2CC0002%3A1%2CC0004%3A1',
-                    'domain': 'wellfound.com',
-                    'path': '/',
-                    'secure': True
-                }
-            ]
+            self.driver.get(self.base_url)
+            self.wait_for_page_ready(states=('interactive', 'complete'))
+            
+            # Prefer cookies from the session store (e.g. posted to /set-cookies);
+            # the built-in cookies only ever stand in for the default account
+            generation = self.session_store.generation
+            cookies = self.session_store.get_cookies()
+            if not cookies and self.account == 'default':
+                cookies = DEFAULT_COOKIES
+            if not cookies:
+                self.logger.error(f"No cookies stored for account {self.account}")
+                return False
             
             # Delete all existing cookies first
             self.driver.delete_all_cookies()
@@ -297,222 +629,329 @@ class WellfoundAutomation:
             # Add each cookie to the browser
             for cookie in cookies:
                 try:
-                    self.driver.add_cookie(cookie)
+                    self.driver.add_cookie(self.cookie_for_site(cookie))
                     self.logger.info(f"Added cookie: {cookie['name']}")
                 except Exception as e:
                     self.logger.error(f"Error adding cookie {cookie['name']}: {str(e)}")
                     return False
+            self.cookie_generation = generation
             
-            # Refresh the page to apply cookies
-            self.driver.refresh()
-            time.sleep(3)
+            # Skip the /inbox round trip while another driver verified these cookies recently
+            if self.session_store.recently_verified():
+                self.logger.info("Session verified recently, skipping login check")
+                return True
             
             # Verify login status
             try:
-                # Try to access a protected page
-                self.driver.get('https://wellfound.com/inbox')
-                time.sleep(3)
+                # Try to access a protected page; the cookies apply on this navigation,
+                # so there is no need to refresh the landing page first
+                self.driver.get(f'{self.base_url}/inbox')
+                
+                # Wait for whichever comes first: the user menu or a redirect to login
+                self.wait.until(lambda d: 'login' in d.current_url.lower() or d.find_elements(
+                    By.CSS_SELECTOR, "[data-test='user-menu'], .user-menu-toggle, .dropdown-toggle"
+                ))
                 
                 # Check if we're still on the login page
                 if 'login' in self.driver.current_url.lower():
                     self.logger.error("Still on login page after adding cookies")
-                    # Save screenshot for debugging
-                    self.driver.save_screenshot("login_redirect_screenshot.png")
+                    self.session_store.mark_invalid()
+                    self.capture_failure('Redirected to login after adding cookies')
                     return False
                 
                 # Additional verification
                 self.wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "[data-test='user-menu'], .user-menu-toggle, .dropdown-toggle")))
                 self.logger.info("Successfully logged in with specific cookies")
+                self.session_store.mark_verified()
                 return True
                 
             except TimeoutException:
                 self.logger.error("Failed to verify login status after adding cookies")
-                # Save screenshot for debugging
-                self.driver.save_screenshot("login_failed_screenshot.png")
+                self.session_store.mark_invalid()
+                self.capture_failure('Login not verified after adding cookies')
                 return False
                 
         except Exception as e:
             self.logger.error(f"Error setting up specific cookies: {str(e)}")
-            # Save screenshot for debugging
-            try:
-                self.driver.save_screenshot("cookie_error_screenshot.png")
-            except:
-                pass
+            self.capture_failure(f'Error setting up cookies: {str(e)}')
             return False
 
+    def capture_failure(self, reason, key=None):
+        """Hand a downscaled JPEG and a DOM snippet of the current page to the diagnostics store.
+
+        Only the two browser round trips happen here; decoding, writing and
+        eviction run on the store's writer thread.
+        """
+        if not self.diagnostics:
+            return
+        try:
+            snapshot = self.driver.execute_script(DOM_SNAPSHOT_SCRIPT, DIAGNOSTICS_DOM_CHARS) or {}
+            screenshot = self.driver.execute_cdp_cmd('Page.captureScreenshot', {
+                'format': 'jpeg',
+                'quality': DIAGNOSTICS_JPEG_QUALITY,
+                'clip': {'x': 0, 'y': 0, 'width': snapshot.get('width') or 1280,
+                         'height': snapshot.get('height') or 800, 'scale': DIAGNOSTICS_SCALE},
+            })['data']
+        except Exception as e:
+            self.logger.warning(f"Could not capture diagnostics: {str(e)}")
+            return
+        self.diagnostics.save(key or self.diagnostics_key or f'session-{self.account}', reason, screenshot, snapshot)
+
+    def needs_cookie_refresh(self):
+        """True if the session store's cookies changed since this driver applied them"""
+        return self.cookie_generation != self.session_store.generation
+
+    def notify_stage(self, stage, **data):
+        """Report progress of the current send to ``on_stage``, if a caller set one"""
+        if stage == 'submitting':
+            self.submitted = True
+        if self.on_stage:
+            try:
+                self.on_stage(stage, **data)
+            except Exception as e:
+                self.logger.warning(f"Stage listener failed for {stage}: {str(e)}")
+
+    def navigate(self, url):
+        """Load ``url`` and wait until the document is ready"""
+        with span('navigate'):
+            self.driver.get(url)
+            self.wait_for_page_ready()
+
+    @timed('send_message')
     def send_message(self, recipient_url, message):
         """Send a message to a recipient"""
         try:
             # Navigate to the recipient's profile
-            self.driver.get(recipient_url)
-            time.sleep(3)  # Wait for page load
-            
-            # Find and click the message button (try different selectors)
-            message_button = None
-            for selector in [
-                "[data-test='message-button']",
-                "button:contains('Message')",
-                ".message-button",
-                "//button[contains(text(), 'Message')]"
-            ]:
-                try:
-                    if selector.startswith("//"):
-                        message_button = self.wait.until(
-                            EC.element_to_be_clickable((By.XPATH, selector))
-                        )
-                    else:
-                        message_button = self.wait.until(
-                            EC.element_to_be_clickable((By.CSS_SELECTOR, selector))
-                        )
-                    break
-                except:
-                    continue
+            self.navigate(recipient_url)
+            self.notify_stage('page_loaded')
+            
+            # Find and click the message button (all candidate selectors are polled together)
+            message_button = MESSAGE_BUTTON.find(self.driver, clickable=True)
             
             if not message_button:
                 raise Exception("Could not find message button")
                 
             message_button.click()
-            time.sleep(2)
-            
-            # Find the message input (try different selectors)
-            message_input = None
-            for selector in [
-                "[data-test='messaging-composer'] textarea",
-                ".message-input",
-                "textarea[placeholder*='message']",
-                "//textarea[contains(@placeholder, 'message')]"
-            ]:
-                try:
-                    if selector.startswith("//"):
-                        message_input = self.wait.until(
-                            EC.presence_of_element_located((By.XPATH, selector))
-                        )
-                    else:
-                        message_input = self.wait.until(
-                            EC.presence_of_element_located((By.CSS_SELECTOR, selector))
-                        )
-                    break
-                except:
-                    continue
+            
+            # Find the message input (all candidate selectors are polled together)
+            message_input = MESSAGE_INPUT.find(self.driver)
             
             if not message_input:
                 raise Exception("Could not find message input")
+            self.notify_stage('composer_found')
                 
-            message_input.clear()
-            message_input.send_keys(message)
-            time.sleep(1)
-            
-            # Find and click the send button (try different selectors)
-            send_button = None
-            for selector in [
-                "[data-test='send-message-button']",
-                "button:contains('Send')",
-                ".send-button",
-                "//button[contains(text(), 'Send')]"
-            ]:
-                try:
-                    if selector.startswith("//"):
-                        send_button = self.wait.until(
-                            EC.element_to_be_clickable((By.XPATH, selector))
-                        )
-                    else:
-                        send_button = self.wait.until(
-                            EC.element_to_be_clickable((By.CSS_SELECTOR, selector))
-                        )
-                    break
-                except:
-                    continue
+            self.type_message(message_input, message)
+            
+            # Find and click the send button (all candidate selectors are polled together)
+            send_button = SEND_BUTTON.find(self.driver, clickable=True)
             
             if not send_button:
                 raise Exception("Could not find send button")
                 
-            send_button.click()
-            time.sleep(2)
+            self.watch_for_confirmation(message_input, message)
+            self.notify_stage('submitting')
+            with span('send_click'):
+                send_button.click()
+            self.notify_stage('sent')
+            self.wait_for_confirmation()
             
             self.logger.info("Message sent successfully")
             return True
             
         except Exception as e:
             self.logger.error(f"Error sending message: {str(e)}")
+            self.capture_failure(f'Error sending message: {str(e)}')
             return False
 
+    @timed('send_company_message')
     def send_company_message(self, message_url, message):
         """Send a message in a company chat thread"""
         try:
             # Navigate directly to the message thread
-            self.driver.get(message_url)
-            time.sleep(3)  # Wait for page load
-            
-            # Find the message input (try different selectors)
-            message_input = None
-            for selector in [
-                "[data-test='messaging-composer'] textarea",
-                "textarea[placeholder*='Type a message']",
-                "textarea.message-input",
-                "//textarea[contains(@placeholder, 'Type')]"
-            ]:
-                try:
-                    if selector.startswith("//"):
-                        message_input = self.wait.until(
-                            EC.presence_of_element_located((By.XPATH, selector))
-                        )
-                    else:
-                        message_input = self.wait.until(
-                            EC.presence_of_element_located((By.CSS_SELECTOR, selector))
-                        )
-                    break
-                except:
-                    continue
+            self.navigate(message_url)
+            self.notify_stage('page_loaded')
+            
+            # Find the message input (all candidate selectors are polled together)
+            message_input = COMPANY_MESSAGE_INPUT.find(self.driver)
             
             if not message_input:
                 raise Exception("Could not find message input")
+            self.notify_stage('composer_found')
                 
             # Clear and enter message
-            message_input.clear()
-            message_input.send_keys(message)
-            time.sleep(1)
-            
-            # Find and click the send button (try different selectors)
-            send_button = None
-            for selector in [
-                "[data-test='send-message']",
-                "button[type='submit']",
-                ".send-button",
-                "//button[contains(text(), 'Send')]"
-            ]:
-                try:
-                    if selector.startswith("//"):
-                        send_button = self.wait.until(
-                            EC.element_to_be_clickable((By.XPATH, selector))
-                        )
-                    else:
-                        send_button = self.wait.until(
-                            EC.element_to_be_clickable((By.CSS_SELECTOR, selector))
-                        )
-                    break
-                except:
-                    continue
-            
-            if not send_button:
-                # Try pressing Enter key if button not found
-                message_input.send_keys(Keys.RETURN)
-                self.logger.info("Used Enter key to send message")
-            else:
-                send_button.click()
-                self.logger.info("Clicked send button")
-            
-            time.sleep(2)
+            self.type_message(message_input, message)
+            
+            # Find and click the send button (all candidate selectors are polled together)
+            send_button = COMPANY_SEND_BUTTON.find(self.driver, clickable=True)
+            
+            self.watch_for_confirmation(message_input, message)
+            self.notify_stage('submitting')
+            with span('send_click'):
+                if not send_button:
+                    # Try pressing Enter key if button not found
+                    message_input.send_keys(Keys.RETURN)
+                    self.logger.info("Used Enter key to send message")
+                else:
+                    send_button.click()
+                    self.logger.info("Clicked send button")
+            self.notify_stage('sent')
+            self.wait_for_confirmation()
             self.logger.info("Company message sent successfully")
             return True
             
         except Exception as e:
             self.logger.error(f"Error sending company message: {str(e)}")
+            self.capture_failure(f'Error sending company message: {str(e)}')
+            return False
+
+    def send(self, message_url, message):
+        """Send to a company thread or a profile, depending on the URL.
+
+        Profile sends use a cached conversation URL when there is one, and
+        fall back to the profile page if it fails before the message went out.
+        """
+        self.last_confirmation = None
+        self.submitted = False
+        if '/jobs/messages/' in message_url:
+            self.logger.info("Detected company message thread")
+            return self.send_to_thread(message_url, message)
+        
+        thread_url = self.thread_cache.get(self.account, message_url) if self.thread_cache else None
+        if thread_url:
+            self.logger.info("Using cached conversation for recipient")
+            if self.send_to_thread(thread_url, message):
+                return True
+            if self.submitted:
+                # The message may have gone out; resending via the profile could duplicate it
+                return False
+            self.logger.info("Cached conversation no longer works, falling back to the profile")
+            self.thread_cache.invalidate(self.account, message_url)
+        
+        self.logger.info("Detected regular message")
+        success = self.send_message(message_url, message)
+        if success and self.thread_cache:
+            self.remember_thread(message_url)
+        return success
+
+    def send_to_thread(self, thread_url, message):
+        """Send in a conversation thread, over HTTP first when the fast path is on"""
+        if self.http_sender:
+            if self.send_http(thread_url, message):
+                return True
+            if self.submitted:
+                # The HTTP send may have gone out; the browser would send it again
+                return False
+        return self.send_company_message(thread_url, message)
+
+    def remember_thread(self, profile_url):
+        """Cache the conversation the profile's Message button led to, if the page moved to one"""
+        try:
+            current = self.driver.current_url.split('#', 1)[0].split('?', 1)[0]
+        except Exception as e:
+            self.logger.warning(f"Could not read conversation URL: {str(e)}")
+            return
+        if '/jobs/messages/' in current and current.startswith(self.base_url + '/'):
+            self.thread_cache.put(self.account, profile_url, current)
+
+    @timed('send_http')
+    def send_http(self, message_url, message):
+        """Try the HTTP fast path with this session's cookies.
+
+        False with ``submitted`` cleared means nothing was sent and the
+        browser may take over; False with ``submitted`` still set means the
+        outcome is unknown and the send must fail rather than be repeated.
+        """
+        try:
+            self.http_sender.set_cookies(self.driver.get_cookies())
+        except Exception as e:
+            self.logger.warning(f"HTTP fast path error: {str(e)}")
+            return False
+        self.notify_stage('submitting')
+        started = time.monotonic()
+        outcome = self.http_sender.send(message_url, message)
+        if outcome == SENT:
+            # The mutation's response is the confirmation
+            self.last_confirmation = {'via': 'http', 'confirm_ms': round((time.monotonic() - started) * 1000)}
+            self.notify_stage('sent')
+            self.notify_stage('confirmed', **self.last_confirmation)
+            return True
+        if outcome == REJECTED:
+            # An explicit rejection means nothing was sent
+            self.submitted = False
+            self.logger.info("HTTP fast path rejected, falling back to browser")
+        else:
+            self.logger.error("HTTP send outcome unknown, not retrying in the browser")
+        return False
+
+    def send_many(self, items):
+        """Send (message_url, message) pairs on this one session.
+
+        Yields a result dict per item as soon as it finishes, so callers can
+        stream progress. ``items`` may be any iterable, including a generator
+        that pulls from a shared queue and yields None while nothing is ready.
+        With ``tabs > 1`` the items are driven concurrently in separate tabs
+        and results arrive in completion order.
+        """
+        if self.tabs > 1:
+            runner = TabRunner(self, self.tabs)
+            flows = (item and (item[0], item[1], COMPANY_FLOW if '/jobs/messages/' in item[0] else PROFILE_FLOW)
+                     for item in items)
+            yield from runner.run(flows)
+            return
+
+        index = -1
+        for item in items:
+            if item is None:
+                time.sleep(0.1)
+                continue
+            message_url, message = item
+            index += 1
+            started = time.monotonic()
+            error = None
+            try:
+                success = self.send(message_url, message)
+                if not success:
+                    error = 'Failed to send message'
+            except Exception as e:
+                success = False
+                error = str(e)
+            yield {
+                'index': index,
+                'message_url': message_url,
+                'success': success,
+                'error': error,
+                'elapsed_ms': round((time.monotonic() - started) * 1000),
+                'confirmation': self.last_confirmation if success else None
+            }
+
+    def is_alive(self):
+        """Cheap health check used before reusing a driver for another message"""
+        try:
+            self.driver.execute_script("return document.readyState")
+            if 'login' in self.driver.current_url.lower():
+                self.logger.warning("Driver session was redirected to the login page")
+                return False
+            return True
+        except Exception as e:
+            self.logger.warning(f"Driver health check failed: {str(e)}")
             return False
 
     def close(self):
         try:
+            if self.http_sender:
+                self.http_sender.close()
             if hasattr(self, 'driver'):
+                # If quit hangs or fails the supervisor kills the process tree
+                SUPERVISOR.closing(self)
                 self.driver.quit()
+                SUPERVISOR.unregister(self)
                 self.logger.info("Driver closed successfully")
+            if self.profile_dir:
+                # Chrome has exited, so the profile is consistent enough to seed the template
+                PROFILE_TEMPLATE.release(self.profile_dir)
+                self.profile_dir = None
         except Exception as e:
             self.logger.error(f"Error closing driver: {str(e)}")
+            if self.profile_dir:
+                shutil.rmtree(self.profile_dir, ignore_errors=True)
+                self.profile_dir = None